@@ -0,0 +1,135 @@
+// Minimal raw DEFLATE decoder (RFC 1951) for browsers without
+// DecompressionStream. Follows the structure of zlib's puff.c.
+const INFLATE_LENGTH_BASE = [3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31, 35, 43, 51, 59, 67, 83, 99, 115, 131, 163, 195, 227, 258];
+const INFLATE_LENGTH_EXTRA = [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 0];
+const INFLATE_DIST_BASE = [1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193, 257, 385, 513, 769, 1025, 1537, 2049, 3073, 4097, 6145, 8193, 12289, 16385, 24577];
+const INFLATE_DIST_EXTRA = [0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11, 12, 12, 13, 13];
+const INFLATE_CLEN_ORDER = [16, 17, 18, 0, 8, 7, 9, 6, 10, 5, 11, 4, 12, 3, 13, 2, 14, 1, 15];
+
+function inflate(data) {
+    let pos = 0;
+    let bitBuf = 0;
+    let bitCount = 0;
+    let out = new Uint8Array(data.length * 4 + 1024);
+    let outLen = 0;
+
+    function bits(n) {
+        while (bitCount < n) {
+            if (pos >= data.length) throw new Error('inflate: unexpected end of data');
+            bitBuf |= data[pos++] << bitCount;
+            bitCount += 8;
+        }
+        const value = bitBuf & ((1 << n) - 1);
+        bitBuf >>>= n;
+        bitCount -= n;
+        return value;
+    }
+
+    function put(byte) {
+        if (outLen === out.length) {
+            const grown = new Uint8Array(out.length * 2);
+            grown.set(out);
+            out = grown;
+        }
+        out[outLen++] = byte;
+    }
+
+    // Canonical Huffman table: number of codes per length, symbols by code
+    function huffman(lengths) {
+        const counts = new Uint16Array(16);
+        const offsets = new Uint16Array(16);
+        const symbols = new Uint16Array(lengths.length);
+        for (const len of lengths) counts[len]++;
+        counts[0] = 0;
+        for (let len = 1; len < 16; len++) offsets[len] = offsets[len - 1] + counts[len - 1];
+        for (let sym = 0; sym < lengths.length; sym++) {
+            if (lengths[sym]) symbols[offsets[lengths[sym]]++] = sym;
+        }
+        return { counts, symbols };
+    }
+
+    function decode(table) {
+        let code = 0;
+        let first = 0;
+        let index = 0;
+        for (let len = 1; len < 16; len++) {
+            code |= bits(1);
+            const count = table.counts[len];
+            if (code - count < first) return table.symbols[index + (code - first)];
+            index += count;
+            first = (first + count) << 1;
+            code <<= 1;
+        }
+        throw new Error('inflate: invalid Huffman code');
+    }
+
+    function inflateCodes(lengthTable, distTable) {
+        for (;;) {
+            const sym = decode(lengthTable);
+            if (sym < 256) {
+                put(sym);
+            } else if (sym === 256) {
+                return;
+            } else {
+                const len = INFLATE_LENGTH_BASE[sym - 257] + bits(INFLATE_LENGTH_EXTRA[sym - 257]);
+                const distSym = decode(distTable);
+                const dist = INFLATE_DIST_BASE[distSym] + bits(INFLATE_DIST_EXTRA[distSym]);
+                for (let i = 0; i < len; i++) put(out[outLen - dist]);
+            }
+        }
+    }
+
+    let last;
+    do {
+        last = bits(1);
+        const type = bits(2);
+        if (type === 0) {
+            // Stored block: skip to the byte boundary, then LEN, NLEN, data
+            bitBuf = 0;
+            bitCount = 0;
+            const len = data[pos] | (data[pos + 1] << 8);
+            pos += 4;
+            for (let i = 0; i < len; i++) put(data[pos++]);
+        } else if (type === 1) {
+            const lengths = new Uint8Array(288);
+            lengths.fill(8, 0, 144);
+            lengths.fill(9, 144, 256);
+            lengths.fill(7, 256, 280);
+            lengths.fill(8, 280, 288);
+            inflateCodes(huffman(lengths), huffman(new Uint8Array(30).fill(5)));
+        } else if (type === 2) {
+            const nlen = bits(5) + 257;
+            const ndist = bits(5) + 1;
+            const ncode = bits(4) + 4;
+            const codeLengths = new Uint8Array(19);
+            for (let i = 0; i < ncode; i++) codeLengths[INFLATE_CLEN_ORDER[i]] = bits(3);
+            const codeTable = huffman(codeLengths);
+
+            const lengths = new Uint8Array(nlen + ndist);
+            for (let i = 0; i < nlen + ndist;) {
+                const sym = decode(codeTable);
+                if (sym < 16) {
+                    lengths[i++] = sym;
+                } else {
+                    let repeat;
+                    let value = 0;
+                    if (sym === 16) {
+                        if (i === 0) throw new Error('inflate: repeat with no previous length');
+                        value = lengths[i - 1];
+                        repeat = 3 + bits(2);
+                    } else if (sym === 17) {
+                        repeat = 3 + bits(3);
+                    } else {
+                        repeat = 11 + bits(7);
+                    }
+                    while (repeat--) lengths[i++] = value;
+                }
+            }
+            inflateCodes(huffman(lengths.subarray(0, nlen)), huffman(lengths.subarray(nlen)));
+        } else {
+            throw new Error('inflate: invalid block type');
+        }
+    } while (!last);
+
+    return out.subarray(0, outLen);
+}
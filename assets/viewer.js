@@ -0,0 +1,1331 @@
+// Decode a data block written by data_block() in build_docs.py:
+// plain JSON, or base64 raw-DEFLATE compressed JSON
+async function readDataBlock(el) {
+    if (el.dataset.encoding !== 'deflate-raw') {
+        return JSON.parse(el.textContent);
+    }
+    const binary = atob(el.textContent.trim());
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    let text;
+    if (typeof DecompressionStream === 'function') {
+        const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate-raw'));
+        text = await new Response(stream).text();
+    } else {
+        text = new TextDecoder().decode(inflate(bytes));
+    }
+    return JSON.parse(text);
+}
+
+// Page titles, ids and links; page content is decoded on first use
+const DOCS_META = JSON.parse(document.getElementById('docs-meta').textContent);
+const PAGE_LIST = DOCS_META.pages;
+
+// Static site builds (--format site): each page is prerendered at
+// <lang>/<page-id>/, so pages link to each other by relative URL
+const SITE = DOCS_META.site || null;
+
+function pageUrl(pageId, sectionId) {
+    return '../' + pageId + '/' + (sectionId ? '#' + sectionId : '');
+}
+const pageTexts = new Map();
+const pageLoads = new Map();
+
+function getPageContent(pageId) {
+    if (pageTexts.has(pageId)) {
+        return Promise.resolve(pageTexts.get(pageId));
+    }
+    let load = pageLoads.get(pageId);
+    if (!load) {
+        const dataEl = document.getElementById('page-data-' + pageId);
+        const page = findPage(pageId);
+        if (dataEl) {
+            load = readDataBlock(dataEl);
+        } else if (DOCS_META.store && page && page.hash) {
+            load = fetchStoreEntry(page.hash);
+        } else {
+            load = Promise.resolve('');
+        }
+        load = load.then(content => {
+            pageTexts.set(pageId, content);
+            pageLoads.delete(pageId);
+            return content;
+        }, err => {
+            // Not cached, so a later visit retries
+            pageLoads.delete(pageId);
+            throw err;
+        });
+        pageLoads.set(pageId, load);
+    }
+    return load;
+}
+
+// Fetch an entry of the shared store written by --shared-store builds:
+// page content (<hash>.md), or JSON entries whose key has the suffix
+async function fetchStoreEntry(key) {
+    const response = await fetch(DOCS_META.store + '/' + (key.includes('.') ? key : key + '.md'));
+    if (!response.ok) {
+        throw new Error(response.status + ' ' + response.statusText);
+    }
+    return response.text();
+}
+
+// Mobile menu toggle
+const menuToggle = document.getElementById('menuToggle');
+const sidebar = document.getElementById('sidebar');
+
+menuToggle.addEventListener('click', () => {
+    sidebar.classList.toggle('open');
+    const isOpen = sidebar.classList.contains('open');
+    menuToggle.textContent = isOpen ? '\u00d7' : '\u2630';
+    menuToggle.setAttribute('aria-expanded', isOpen);
+});
+
+// Close sidebar when clicking outside on mobile
+document.addEventListener('click', (e) => {
+    if (window.innerWidth < 1024) {
+        if (!sidebar.contains(e.target) && !menuToggle.contains(e.target)) {
+            sidebar.classList.remove('open');
+            menuToggle.textContent = '\u2630';
+            menuToggle.setAttribute('aria-expanded', 'false');
+        }
+    }
+});
+
+// Theme toggle functionality
+const themeToggle = document.getElementById('themeToggle');
+const root = document.documentElement;
+
+// Get saved theme or detect system preference
+function getPreferredTheme() {
+    const savedTheme = localStorage.getItem('theme');
+    if (savedTheme) {
+        return savedTheme;
+    }
+    return window.matchMedia('(prefers-color-scheme: dark)').matches ? 'dark' : 'light';
+}
+
+// Apply theme
+function setTheme(theme) {
+    root.setAttribute('data-theme', theme);
+    localStorage.setItem('theme', theme);
+}
+
+// Initialize theme
+const initialTheme = getPreferredTheme();
+if (localStorage.getItem('theme')) {
+    setTheme(initialTheme);
+}
+
+// Toggle theme on button click
+themeToggle.addEventListener('click', () => {
+    const currentTheme = root.getAttribute('data-theme');
+    const prefersDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
+
+    // Determine current effective theme
+    let effectiveTheme;
+    if (currentTheme) {
+        effectiveTheme = currentTheme;
+    } else {
+        effectiveTheme = prefersDark ? 'dark' : 'light';
+    }
+
+    // Toggle to opposite theme
+    const newTheme = effectiveTheme === 'dark' ? 'light' : 'dark';
+    setTheme(newTheme);
+});
+
+// Listen for system theme changes
+window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', (e) => {
+    if (!localStorage.getItem('theme')) {
+        // Only auto-switch if user hasn't manually set a preference
+        root.removeAttribute('data-theme');
+    }
+});
+
+// Copy icon, referencing the shared <symbol> in the page body
+const COPY_ICON = '<svg aria-hidden="true"><use href="#icon-copy"></use></svg>';
+
+// 32-bit FNV-1a hash of a string, in base 36
+function hashString(text) {
+    let hash = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) {
+        hash ^= text.charCodeAt(i);
+        hash = Math.imul(hash, 0x01000193);
+    }
+    return (hash >>> 0).toString(36);
+}
+
+// Syntax-highlighted code blocks, tokenised at build time and loaded
+// before a page is parsed: "<fence language>:<code hash>" ->
+// runs of [characters since the previous token, token length, kind]
+const HIGHLIGHT_KINDS = ['keyword', 'string', 'number', 'comment', 'type', 'function', 'literal',
+    'property', 'variable', 'option'];
+let codeHighlightsLoad = null;
+const pageHighlightLoads = new Map();
+
+// Returns a promise of the highlights for the code blocks of a page.
+// Without them code blocks are shown plain.
+function loadCodeHighlights(pageId) {
+    const page = findPage(pageId);
+    if (page && page.highlights) {
+        // Versioned builds keep each page's highlights in the store
+        let load = pageHighlightLoads.get(page.highlights);
+        if (!load) {
+            load = fetchStoreEntry(page.highlights).then(JSON.parse).catch(() => {
+                // Not kept, so the next render of the page retries
+                pageHighlightLoads.delete(page.highlights);
+                return {};
+            });
+            pageHighlightLoads.set(page.highlights, load);
+        }
+        return load;
+    }
+    if (!codeHighlightsLoad) {
+        const highlightsEl = document.getElementById('code-highlights');
+        const load = highlightsEl ? readDataBlock(highlightsEl)
+            : DOCS_META.codeHighlights ? fetch(DOCS_META.codeHighlights).then(response => response.json())
+            : Promise.resolve({});
+        codeHighlightsLoad = load.catch(() => ({}));
+    }
+    return codeHighlightsLoad;
+}
+
+// Code wrapped in the spans of highlight_code() in build_docs.py
+function highlightCode(code, runs) {
+    let html = '';
+    let pos = 0;
+    for (let i = 0; i < runs.length; i += 3) {
+        const start = pos + runs[i];
+        const end = start + runs[i + 1];
+        html += escapeText(code.substring(pos, start)) + '<span class="hl-' + HIGHLIGHT_KINDS[runs[i + 2]] + '">' +
+            escapeText(code.substring(start, end)) + '</span>';
+        pos = end;
+    }
+    return html + escapeText(code.substring(pos));
+}
+
+// Markdown parser (returns the HTML of each top-level block); code blocks
+// are highlighted from the runs in highlights (see loadCodeHighlights())
+function parseMarkdown(md, highlights) {
+    let lines = md.split('\n');
+    const blocks = [];
+    let inCodeBlock = false;
+    let codeBlockContent = '';
+    let codeBlockLang = '';
+    let inList = false;
+    let listContent = '';
+    let inBlockquote = false;
+    let blockquoteContent = '';
+    let inTable = false;
+    let tableRows = [];
+    let tableHasHeader = false;
+    const usedIds = new Map();
+    const usedCodeIds = new Map();
+
+    // Code block ids are derived from the code itself, so rendering the
+    // same page always produces the same HTML
+    function uniqueCodeId(codeHash) {
+        const base = 'code-' + codeHash;
+        const count = usedCodeIds.get(base) || 0;
+        usedCodeIds.set(base, count + 1);
+        return count ? base + '-' + count : base;
+    }
+
+    // Each top-level block is kept separately so pages can be rendered incrementally
+    function emit(block) {
+        blocks.push(block);
+    }
+
+    function processInlineMarkdown(text) {
+        text = text.replace(/\*\*(.+?)\*\*/g, '<strong>$1</strong>');
+        text = text.replace(/\*([^*]+)\*/g, '<em>$1</em>');
+        text = text.replace(/`([^`]+)`/g, '<code>$1</code>');
+        text = text.replace(/\[([^\]]+)\]\(([^)]+)\)/g, (match, label, href) => {
+            // Site pages link to other pages by URL (kept in sync with parse_document() and render_blocks() in build_docs.py)
+            const pageId = href.substring(1);
+            if (SITE && href.startsWith('#') && findPage(pageId)) {
+                return '<a href="' + pageUrl(pageId) + '" data-page="' + pageId + '">' + label + '</a>';
+            }
+            return '<a href="' + href + '">' + label + '</a>';
+        });
+        return text;
+    }
+
+    function makeId(text) {
+        return text.toLowerCase()
+            .replace(/[^\p{L}\p{N}_\s-]/gu, '')
+            .replace(/\s+/g, '-')
+            .replace(/^-+|-+$/g, '');
+    }
+
+    // Heading ids are unique per page (kept in sync with make_heading_id() in build_docs.py)
+    function uniqueId(text) {
+        const base = makeId(text) || 'section';
+        const count = usedIds.get(base) || 0;
+        usedIds.set(base, count + 1);
+        return count ? base + '-' + count : base;
+    }
+
+    function flushList() {
+        if (inList && listContent) {
+            emit('<ul>\n' + listContent + '</ul>\n');
+            listContent = '';
+            inList = false;
+        }
+    }
+
+    function flushBlockquote() {
+        if (inBlockquote && blockquoteContent) {
+            emit('<blockquote>' + processInlineMarkdown(blockquoteContent.trim()) + '</blockquote>\n');
+            blockquoteContent = '';
+            inBlockquote = false;
+        }
+    }
+
+    function flushTable() {
+        if (inTable && tableRows.length > 0) {
+            let table = '<div class="table-wrapper" role="region" aria-label="Data table" tabindex="0"><table>\n';
+            let bodyStarted = false;
+            for (let r = 0; r < tableRows.length; r++) {
+                const row = tableRows[r];
+                const isHeader = tableHasHeader && r === 0;
+                const tag = isHeader ? 'th' : 'td';
+                if (isHeader) {
+                    table += '<thead>\n';
+                } else if (tableHasHeader && r === 1 && !bodyStarted) {
+                    table += '<tbody>\n';
+                    bodyStarted = true;
+                }
+                table += '<tr>\n';
+                for (const cell of row) {
+                    const scope = isHeader ? ' scope="col"' : '';
+                    table += '<' + tag + scope + '>' + processInlineMarkdown(cell.trim()) + '</' + tag + '>\n';
+                }
+                table += '</tr>\n';
+                if (isHeader) {
+                    table += '</thead>\n';
+                }
+            }
+            if (bodyStarted) {
+                table += '</tbody>\n';
+            }
+            table += '</table></div>\n';
+            emit(table);
+            tableRows = [];
+            inTable = false;
+            tableHasHeader = false;
+        }
+    }
+
+    function isTableSeparator(line) {
+        return /^\|?[\s-:|]+\|[\s-:|]+\|?$/.test(line) && line.includes('-');
+    }
+
+    function parseTableRow(line) {
+        let cells = line.split('|');
+        // Remove empty first/last cells from leading/trailing |
+        if (cells.length > 0 && cells[0].trim() === '') cells.shift();
+        if (cells.length > 0 && cells[cells.length - 1].trim() === '') cells.pop();
+        return cells;
+    }
+
+    for (let i = 0; i < lines.length; i++) {
+        let line = lines[i];
+        const trimmedLine = line.trim();
+
+        // Handle code blocks (including indented ones in lists)
+        if (trimmedLine.startsWith('```')) {
+            if (inCodeBlock) {
+                const codeHash = hashString(codeBlockContent);
+                const codeId = uniqueCodeId(codeHash);
+                const langDisplay = codeBlockLang || 'code';
+                // Highlighted at build time (see highlight_code() in build_docs.py)
+                const runs = highlights[codeBlockLang + ':' + codeHash];
+                emit('<div class="code-block"><div class="code-header">' +
+                    `<span class="code-lang">${langDisplay}</span>` +
+                    `<button class="copy-btn" type="button" aria-label="Copy code">${COPY_ICON}<span>Copy</span></button>` +
+                    `</div><pre><code id="${codeId}">` + (runs ? highlightCode(codeBlockContent, runs) : escapeHtml(codeBlockContent)) +
+                    '</code></pre></div>\n');
+                codeBlockContent = '';
+                codeBlockLang = '';
+                inCodeBlock = false;
+            } else {
+                flushList();
+                flushBlockquote();
+                inCodeBlock = true;
+                codeBlockLang = trimmedLine.substring(3).trim();
+            }
+            continue;
+        }
+
+        if (inCodeBlock) {
+            codeBlockContent += line + '\n';
+            continue;
+        }
+
+        // Table handling
+        if (trimmedLine.includes('|')) {
+            if (trimmedLine.startsWith('|') || trimmedLine.endsWith('|')) {
+                flushList();
+                flushBlockquote();
+                if (isTableSeparator(trimmedLine)) {
+                    // This is the separator row (|---|---|), mark header
+                    if (tableRows.length === 1) {
+                        tableHasHeader = true;
+                    }
+                } else {
+                    // Regular table row
+                    tableRows.push(parseTableRow(trimmedLine));
+                    inTable = true;
+                }
+                continue;
+            }
+        }
+        // Flush table if we hit a non-table line
+        if (inTable) {
+            flushTable();
+        }
+
+        if (line.startsWith('# ')) {
+            flushList();
+            flushBlockquote();
+            const text = line.substring(2).trim();
+            const id = uniqueId(text);
+            emit(`<h1 class="section-anchor" id="${id}">${processInlineMarkdown(text)}</h1>\n`);
+            continue;
+        }
+        if (line.startsWith('## ')) {
+            flushList();
+            flushBlockquote();
+            const text = line.substring(3).trim();
+            const id = uniqueId(text);
+            emit(`<h2 class="section-anchor" id="${id}">${processInlineMarkdown(text)}</h2>\n`);
+            continue;
+        }
+        if (line.startsWith('### ')) {
+            flushList();
+            flushBlockquote();
+            const text = line.substring(4).trim();
+            const id = uniqueId(text);
+            emit(`<h3 class="section-anchor" id="${id}">${processInlineMarkdown(text)}</h3>\n`);
+            continue;
+        }
+        if (line.startsWith('#### ')) {
+            flushList();
+            flushBlockquote();
+            const text = line.substring(5).trim();
+            const id = uniqueId(text);
+            emit(`<h4 class="section-anchor" id="${id}">${processInlineMarkdown(text)}</h4>\n`);
+            continue;
+        }
+
+        if (line.trim() === '---') {
+            flushList();
+            flushBlockquote();
+            emit('<hr>\n');
+            continue;
+        }
+
+        if (line.startsWith('> ')) {
+            flushList();
+            blockquoteContent += line.substring(2) + ' ';
+            inBlockquote = true;
+            continue;
+        } else if (inBlockquote && line.trim() === '') {
+            flushBlockquote();
+            continue;
+        }
+
+        if (line.startsWith('- ') || line.startsWith('* ')) {
+            flushBlockquote();
+            const text = line.substring(2).trim();
+            listContent += '<li>' + processInlineMarkdown(text) + '</li>\n';
+            inList = true;
+            continue;
+        } else if (inList && line.trim() !== '' && !line.startsWith('#')) {
+            listContent = listContent.trimEnd();
+            if (listContent.endsWith('</li>')) {
+                listContent = listContent.substring(0, listContent.length - 5);
+                listContent += ' ' + processInlineMarkdown(line.trim()) + '</li>\n';
+            }
+            continue;
+        } else if (inList && line.trim() === '') {
+            flushList();
+            continue;
+        }
+
+        if (line.trim() === '') {
+            flushList();
+            flushBlockquote();
+            continue;
+        }
+
+        flushList();
+        flushBlockquote();
+        if (line.trim() !== '') {
+            emit('<p>' + processInlineMarkdown(line) + '</p>\n');
+        }
+    }
+
+    flushList();
+    flushBlockquote();
+    flushTable();
+
+    return blocks;
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+// escapeHtml() without the DOM, for the many small pieces of highlighted code
+const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '\u00a0': '&nbsp;' };
+
+function escapeText(text) {
+    return text.replace(/[&<>\u00a0]/g, ch => HTML_ESCAPES[ch]);
+}
+
+// Copy a code block's contents to the clipboard
+function copyCode(btn) {
+    const codeElement = btn.closest('.code-block').querySelector('code');
+    if (!codeElement) return;
+
+    const text = codeElement.textContent;
+    navigator.clipboard.writeText(text).then(() => {
+        const originalText = btn.querySelector('span').textContent;
+        btn.classList.add('copied');
+        btn.querySelector('span').textContent = 'Copied!';
+
+        setTimeout(() => {
+            btn.classList.remove('copied');
+            btn.querySelector('span').textContent = originalText;
+        }, 2000);
+    }).catch(err => {
+        console.error('Failed to copy:', err);
+    });
+}
+
+// One delegated listener handles the copy buttons of every code block,
+// and page links (including "See also") when site pages navigate on the
+// client
+document.getElementById('main-content').addEventListener('click', (e) => {
+    const btn = e.target.closest('.copy-btn');
+    if (btn) {
+        copyCode(btn);
+        return;
+    }
+    const pageLink = SITE && SITE.clientNav && e.target.closest('a[data-page]');
+    if (pageLink) {
+        e.preventDefault();
+        loadPage(pageLink.dataset.page);
+    }
+});
+
+// Incremental rendering: the first screenful of blocks is inserted
+// immediately and the rest of the page is appended in small slices
+// while the main thread is idle. Appended sections use
+// content-visibility so off-screen ones skip layout and paint.
+const INITIAL_RENDER_CHARS = 16000;
+const DEFERRED_SECTION_CHARS = 24000;
+const SLICE_BUDGET_MS = 8;
+let pendingSections = [];
+let renderGeneration = 0;
+
+function isSectionStart(block) {
+    return /^<h[1-3] /.test(block);
+}
+
+// Split parsed blocks into the initial HTML and deferred sections,
+// starting a new section at each h1-h3 heading
+function splitBlocks(blocks) {
+    let i = 0;
+    let size = 0;
+    while (i < blocks.length && size < INITIAL_RENDER_CHARS) {
+        size += blocks[i].length;
+        i++;
+    }
+    const initial = blocks.slice(0, i).join('');
+
+    const sections = [];
+    let current = '';
+    for (; i < blocks.length; i++) {
+        if (current && (isSectionStart(blocks[i]) || current.length >= DEFERRED_SECTION_CHARS)) {
+            sections.push(current);
+            current = '';
+        }
+        current += blocks[i];
+    }
+    if (current) sections.push(current);
+    return { initial, sections };
+}
+
+function yieldToMain() {
+    if (window.scheduler && typeof window.scheduler.yield === 'function') {
+        return window.scheduler.yield();
+    }
+    return new Promise(resolve => {
+        if (window.requestIdleCallback) {
+            window.requestIdleCallback(() => resolve(), { timeout: 200 });
+        } else {
+            setTimeout(resolve, 0);
+        }
+    });
+}
+
+function appendSection(contentEl, html) {
+    contentEl.insertAdjacentHTML('beforeend', '<div class="deferred-section">' + html + '</div>');
+}
+
+function renderBlocks(contentEl, blocks) {
+    const generation = ++renderGeneration;
+    const { initial, sections } = splitBlocks(blocks);
+    contentEl.innerHTML = initial;
+    pendingSections = sections;
+
+    (async () => {
+        while (pendingSections.length > 0) {
+            await yieldToMain();
+            // Stop if another page has been loaded in the meantime
+            if (generation !== renderGeneration) return;
+            const start = performance.now();
+            while (pendingSections.length > 0 && performance.now() - start < SLICE_BUDGET_MS) {
+                appendSection(contentEl, pendingSections.shift());
+            }
+        }
+    })();
+}
+
+// Synchronously append every section that hasn't been rendered yet
+function flushPendingSections() {
+    const contentEl = document.getElementById('content');
+    const sections = pendingSections;
+    pendingSections = [];
+    sections.forEach(html => appendSection(contentEl, html));
+}
+
+// Find an anchor on the current page, rendering the rest of the page if needed
+function findAnchor(id) {
+    let el = document.getElementById(id);
+    if (!el && pendingSections.length > 0) {
+        flushPendingSections();
+        el = document.getElementById(id);
+    }
+    return el;
+}
+
+let currentPageId = null;
+
+function findPage(pageId) {
+    return PAGE_LIST.find(p => p.id === pageId);
+}
+
+// Parsed pages, most recently used last. Pages likely to be opened
+// next are parsed ahead of time while the browser is idle.
+const RENDER_CACHE_SIZE = 12;
+const renderCache = new Map();
+const NAV_ORDER = PAGE_LIST.map(p => p.id);
+let prefetchQueue = [];
+let prefetchScheduled = false;
+
+// Returns a promise of the page's parsed blocks
+function getRenderedBlocks(pageId) {
+    let blocks = renderCache.get(pageId);
+    if (blocks) {
+        renderCache.delete(pageId);
+    } else {
+        blocks = Promise.all([getPageContent(pageId), loadCodeHighlights(pageId)])
+            .then(([md, highlights]) => parseMarkdown(md, highlights));
+        // A page that failed to load is dropped, so a later visit retries
+        const failed = blocks;
+        failed.catch(() => {
+            if (renderCache.get(pageId) === failed) renderCache.delete(pageId);
+        });
+        if (renderCache.size >= RENDER_CACHE_SIZE) {
+            renderCache.delete(renderCache.keys().next().value);
+        }
+    }
+    renderCache.set(pageId, blocks);
+    return blocks;
+}
+
+function runPrefetch(deadline) {
+    prefetchScheduled = false;
+    while (prefetchQueue.length > 0) {
+        if (deadline && deadline.timeRemaining() < 5) break;
+        const pageId = prefetchQueue.shift();
+        if (!renderCache.has(pageId) && findPage(pageId)) {
+            getRenderedBlocks(pageId).catch(() => {});
+        }
+        if (!deadline) break;
+    }
+    if (prefetchQueue.length > 0) schedulePrefetch();
+}
+
+function schedulePrefetch() {
+    if (prefetchScheduled) return;
+    prefetchScheduled = true;
+    if (window.requestIdleCallback) {
+        window.requestIdleCallback(runPrefetch, { timeout: 2000 });
+    } else {
+        setTimeout(runPrefetch, 50);
+    }
+}
+
+// Queue pages for idle-time parsing; earlier ids are parsed first
+function prefetchPages(pageIds) {
+    const wanted = pageIds.filter(id => id && !renderCache.has(id));
+    prefetchQueue = wanted.concat(prefetchQueue.filter(id => !wanted.includes(id)))
+        .slice(0, RENDER_CACHE_SIZE - 1);
+    if (prefetchQueue.length > 0) schedulePrefetch();
+}
+
+// Neighbours in navigation order and the pages this page links to
+function prefetchNeighbours(pageId) {
+    const index = NAV_ORDER.indexOf(pageId);
+    prefetchPages([NAV_ORDER[index + 1], NAV_ORDER[index - 1]].concat(findPage(pageId).links || []));
+}
+
+// List the related pages found at build time under the page
+function renderSeeAlso(pageId) {
+    const el = document.getElementById('seeAlso');
+    const related = (findPage(pageId).related || []).map(findPage).filter(Boolean);
+    el.hidden = related.length === 0;
+    el.innerHTML = related.length === 0 ? '' : '<h2>See also</h2><ul>' + related.map(page =>
+        '<li><a href="' + (SITE ? pageUrl(page.id) : '#' + page.id) + '" data-page="' + page.id + '">' +
+        escapeHtml(page.title.split(' -> ').pop()) + '</a></li>'
+    ).join('') + '</ul>';
+}
+
+// Load a page, optionally scrolling to one of its sections
+let loadGeneration = 0;
+
+async function loadPage(pageId, sectionId) {
+    const pageData = findPage(pageId);
+    if (!pageData) {
+        console.error('Page not found:', pageId);
+        return;
+    }
+
+    const generation = ++loadGeneration;
+    const contentEl = document.getElementById('content');
+    if (pageId !== currentPageId) {
+        let blocks;
+        let loaded = true;
+        try {
+            blocks = await getRenderedBlocks(pageId);
+        } catch (err) {
+            blocks = ['<p><em>Could not load this page (' + escapeHtml(err.message) + ').</em></p>\n'];
+            loaded = false;
+        }
+        // A later navigation superseded this one while it was decoding
+        if (generation !== loadGeneration) return;
+        renderBlocks(contentEl, blocks);
+        renderSeeAlso(pageId);
+        // After a failure, opening the page again retries the load
+        currentPageId = loaded ? pageId : null;
+        if (loaded) prefetchNeighbours(pageId);
+
+        // Update active nav link and aria-current
+        document.querySelectorAll('.nav-link').forEach(link => {
+            link.classList.remove('active');
+            link.removeAttribute('aria-current');
+            if (link.dataset.page === pageId) {
+                link.classList.add('active');
+                link.setAttribute('aria-current', 'page');
+            }
+        });
+    }
+
+    // Scroll to the section, or to the top of the page
+    const target = sectionId ? findAnchor(sectionId) : null;
+    if (target) {
+        target.scrollIntoView();
+    } else {
+        window.scrollTo(0, 0);
+    }
+
+    // Move focus to content for screen readers
+    contentEl.setAttribute('tabindex', '-1');
+    contentEl.focus({ preventScroll: true });
+
+    // Update URL (the page's own address on site builds, else the hash)
+    if (SITE) {
+        const url = new URL(pageUrl(pageId, sectionId), window.location.href).href;
+        if (url !== window.location.href) {
+            history.pushState(null, '', url);
+        }
+        return;
+    }
+    const hash = sectionId ? pageId + '/' + sectionId : pageId;
+    if (currentHash() !== hash) {
+        window.location.hash = hash;
+    }
+}
+
+// Open a page from navigation or search; site pages without client
+// navigation are ordinary links
+function openPage(pageId, sectionId) {
+    if (SITE && !SITE.clientNav) {
+        window.location.href = pageUrl(pageId, sectionId);
+    } else {
+        loadPage(pageId, sectionId);
+    }
+}
+
+function currentHash() {
+    const hash = window.location.hash.substring(1);
+    try {
+        return decodeURIComponent(hash);
+    } catch (e) {
+        return hash;
+    }
+}
+
+// Navigate to a hash of the form "page", "page/section", or a bare
+// heading id on the current page (in-page markdown links)
+function navigateToHash(hash) {
+    const slash = hash.indexOf('/');
+    const pageId = slash === -1 ? hash : hash.substring(0, slash);
+    const sectionId = slash === -1 ? '' : hash.substring(slash + 1);
+    if (!findPage(pageId) && currentPageId && findAnchor(hash)) {
+        loadPage(currentPageId, hash);
+    } else {
+        loadPage(pageId, sectionId);
+    }
+}
+
+// Setup navigation
+document.querySelectorAll('.nav-link').forEach(link => {
+    link.addEventListener('click', (e) => {
+        if (SITE && !SITE.clientNav) return;
+        e.preventDefault();
+        const pageId = link.dataset.page;
+        loadPage(pageId);
+
+        // Close mobile menu
+        if (window.innerWidth < 1024) {
+            sidebar.classList.remove('open');
+            menuToggle.textContent = '\u2630';
+        }
+    });
+
+    // Start parsing a page as soon as the user shows interest in it
+    const prefetchLink = () => prefetchPages([link.dataset.page]);
+    link.addEventListener('mouseenter', prefetchLink);
+    link.addEventListener('focus', prefetchLink);
+});
+
+// Handle browser back/forward
+if (SITE) {
+    window.addEventListener('popstate', () => {
+        const parts = window.location.pathname.split('/').filter(part => part && part !== 'index.html');
+        const pageId = decodeURIComponent(parts[parts.length - 1] || '');
+        if (findPage(pageId)) {
+            loadPage(pageId, currentHash());
+        }
+    });
+} else {
+    window.addEventListener('hashchange', () => {
+        const hash = currentHash();
+        if (hash) {
+            navigateToHash(hash);
+        }
+    });
+}
+
+// Search functionality
+const searchInput = document.getElementById('searchInput');
+const searchResults = document.getElementById('searchResults');
+const searchContainer = document.getElementById('searchContainer');
+const searchToggle = document.getElementById('searchToggle');
+let selectedIndex = -1;
+let currentResults = [];
+
+// The search index is decoded on first use
+let searchData = null;
+let searchIndex = null;
+let searchIndexLoad = null;
+
+function loadSearchIndex() {
+    if (!searchIndexLoad) {
+        // Site builds keep the index in a separate file, and versioned
+        // builds one per page in the store, fetched on first search
+        const indexEl = document.getElementById('search-index');
+        const load = indexEl ? readDataBlock(indexEl)
+            : DOCS_META.searchIndex ? fetch(DOCS_META.searchIndex).then(response => {
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                return response.json();
+            })
+            : Promise.all(PAGE_LIST.map(page => fetchStoreEntry(page.index).then(JSON.parse)))
+                .then(mergeSearchIndexes);
+        searchIndexLoad = load.then(expandSearchIndex).catch(err => {
+            // Not cached, so the next search retries
+            searchIndexLoad = null;
+            throw err;
+        });
+    }
+    return searchIndexLoad;
+}
+
+// Combine the indexes of single pages (in navigation order) into one
+function mergeSearchIndexes(parts) {
+    const pages = [];
+    const sections = [];
+    const postings = new Map();
+    for (const part of parts) {
+        const first = sections.length;
+        for (const [, ...section] of part.sections) {
+            sections.push([pages.length, ...section]);
+        }
+        pages.push(...part.pages);
+        part.terms.forEach((term, i) => {
+            let entries = postings.get(term);
+            if (!entries) {
+                entries = [];
+                postings.set(term, entries);
+            }
+            const posting = part.postings[i];
+            for (let j = 0; j < posting.length; j += part.width) {
+                entries.push(first + parseInt(posting.substring(j, j + part.width), 36));
+            }
+        });
+    }
+    const width = Math.max(sections.length - 1, 0).toString(36).length;
+    const terms = [...postings.keys()].sort();
+    return {
+        pages: pages,
+        sections: sections,
+        width: width,
+        terms: terms,
+        postings: terms.map(term => postings.get(term).map(n => n.toString(36).padStart(width, '0')).join(''))
+    };
+}
+
+// Expand the index's sections into searchable entries. Section text
+// is only sliced out of the page content when a query reaches it.
+function expandSearchIndex(data) {
+    searchData = data;
+
+    const titles = {};
+    for (const page of PAGE_LIST) {
+        titles[page.id] = page.title;
+    }
+
+    searchIndex = searchData.sections.map(([pageNum, sectionId, heading, offset, length], i) => {
+        const pageId = searchData.pages[pageNum];
+
+        // Extract section from page ID
+        const parts = pageId.split('-');
+        let section = '';
+        if (parts.length > 1) {
+            section = parts.slice(0, -1).join(' ');
+        }
+
+        return {
+            title: titles[pageId],
+            pageId: pageId,
+            sectionId: sectionId,
+            section: section,
+            heading: heading,
+            isFirst: i === 0 || searchData.sections[i - 1][0] !== pageNum,
+            offset: offset,
+            length: length,
+            text: null,
+            content: ''
+        };
+    });
+}
+
+// Section text; the page must already be decoded (see search())
+function sectionText(item) {
+    if (item.text === null) {
+        const pageText = pageTexts.get(item.pageId);
+        if (pageText === undefined) return '';
+        item.text = pageText.substring(item.offset, item.offset + item.length);
+        item.content = item.text.toLowerCase();
+    }
+    return item.text;
+}
+
+// Get preview text (first 200 chars, stripped of markdown)
+function sectionPreview(item) {
+    return sectionText(item)
+        .replace(/^#+\s+.+$/gm, '')  // Remove headings
+        .replace(/```[\s\S]*?```/g, '')  // Remove code blocks
+        .replace(/`[^`]+`/g, '')  // Remove inline code
+        .replace(/\[([^\]]+)\]\([^)]+\)/g, '$1')  // Convert links to text
+        .replace(/\*\*([^*]+)\*\*/g, '$1')  // Remove bold
+        .replace(/\*([^*]+)\*/g, '$1')  // Remove italic
+        .replace(/\n+/g, ' ')  // Normalize whitespace
+        .trim()
+        .substring(0, 200);
+}
+
+// Search term extraction, mirroring tokenize_for_search() in build_docs.py
+const CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f';
+const TOKEN_REGEX = new RegExp('([' + CJK_CHARS + ']+)|((?:(?![' + CJK_CHARS + '])[\\p{L}\\p{N}_])+)', 'gu');
+
+function tokenize(text) {
+    const terms = new Set();
+    for (const match of text.toLowerCase().matchAll(TOKEN_REGEX)) {
+        const cjk = match[1];
+        const word = match[2];
+        if (cjk) {
+            if (cjk.length === 1) terms.add(cjk);
+            for (let i = 0; i < cjk.length - 1; i++) {
+                terms.add(cjk.substring(i, i + 2));
+            }
+        } else {
+            terms.add(word);
+            if (word.includes('_')) {
+                word.split('_').forEach(part => { if (part) terms.add(part); });
+            }
+        }
+    }
+    return terms;
+}
+
+// Section numbers whose postings contain a term starting with the given prefix
+function lookupTerm(prefix) {
+    const terms = searchData.terms;
+    const width = searchData.width;
+    const sections = new Set();
+
+    // Binary search for the first term >= prefix
+    let lo = 0;
+    let hi = terms.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (terms[mid] < prefix) lo = mid + 1;
+        else hi = mid;
+    }
+
+    for (let i = lo; i < terms.length && terms[i].startsWith(prefix); i++) {
+        const posting = searchData.postings[i];
+        for (let j = 0; j < posting.length; j += width) {
+            sections.add(parseInt(posting.substring(j, j + width), 36));
+        }
+    }
+    return sections;
+}
+
+// Sections containing every term of the query (terms match by prefix
+// so partially typed words still hit). Returns null if the query has
+// no indexable terms, e.g. when it is only punctuation.
+function lookupSections(query) {
+    const terms = tokenize(query);
+    if (terms.size === 0) return null;
+
+    let sections = null;
+    for (const term of terms) {
+        const matched = lookupTerm(term);
+        sections = sections === null ? matched : new Set([...sections].filter(n => matched.has(n)));
+        if (sections.size === 0) break;
+    }
+    return sections;
+}
+
+// Search function
+async function search(query) {
+    if (!query || query.length < 2) return [];
+
+    const q = query.toLowerCase().trim();
+    const results = [];
+    await loadSearchIndex();
+
+    // Narrow down to sections from the index before scanning any text
+    const candidates = lookupSections(q);
+    if (candidates && candidates.size === 0) return [];
+
+    // Decode the pages the candidate sections live in
+    const pageIds = new Set();
+    searchIndex.forEach((item, i) => {
+        if (!candidates || candidates.has(i)) pageIds.add(item.pageId);
+    });
+    // (sections of a page that fails to load are matched on their heading)
+    await Promise.all([...pageIds].map(pageId => getPageContent(pageId).catch(() => {})));
+
+    for (let i = 0; i < searchIndex.length; i++) {
+        if (candidates && !candidates.has(i)) continue;
+
+        const item = searchIndex[i];
+        let score = 0;
+        let matchedHeading = null;
+        let matchContext = '';
+
+        // Check title (highest priority), once per page
+        if (item.isFirst) {
+            const titleLower = item.title.toLowerCase();
+            if (titleLower === q) {
+                score = 100;
+            } else if (titleLower.startsWith(q)) {
+                score = 80;
+            } else if (titleLower.includes(q)) {
+                score = 60;
+            }
+        }
+
+        // Check the section heading
+        if (item.heading) {
+            const headingLower = item.heading.toLowerCase();
+            if (headingLower === q) {
+                score = Math.max(score, 50);
+                matchedHeading = item.heading;
+            } else if (headingLower.includes(q)) {
+                score = Math.max(score, 40);
+                matchedHeading = item.heading;
+            }
+        }
+
+        // Check content
+        sectionText(item);
+        if (item.content.includes(q)) {
+            score = Math.max(score, 20);
+
+            // Find context around the match
+            const idx = item.content.indexOf(q);
+            const start = Math.max(0, idx - 40);
+            const end = Math.min(item.content.length, idx + q.length + 60);
+            matchContext = item.content.substring(start, end);
+            if (start > 0) matchContext = '...' + matchContext;
+            if (end < item.content.length) matchContext = matchContext + '...';
+        } else if (candidates) {
+            // All terms occur in the section, just not as one phrase
+            score = Math.max(score, 10);
+        }
+
+        if (score > 0) {
+            results.push({
+                title: item.title,
+                pageId: item.pageId,
+                sectionId: item.sectionId,
+                section: item.section,
+                score: score,
+                matchedHeading: matchedHeading || item.heading,
+                preview: matchContext || sectionPreview(item),
+                query: q
+            });
+        }
+    }
+
+    // Sort by score descending (stable, so ties keep document order)
+    results.sort((a, b) => b.score - a.score);
+
+    // Limit to 10 results, at most 3 sections from any one page
+    const perPage = {};
+    return results.filter(result => {
+        perPage[result.pageId] = (perPage[result.pageId] || 0) + 1;
+        return perPage[result.pageId] <= 3;
+    }).slice(0, 10);
+}
+
+// Highlight query in text
+function highlightText(text, query) {
+    if (!query) return text;
+    const regex = new RegExp(`(${query.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')})`, 'gi');
+    return text.replace(regex, '<mark>$1</mark>');
+}
+
+// Render search results
+function renderResults(results, query) {
+    const liveRegion = document.getElementById('searchLiveRegion');
+    if (results.length === 0) {
+        searchResults.innerHTML = '<div class="search-no-results" role="status">No results found</div>';
+        searchInput.setAttribute('aria-expanded', 'true');
+        if (liveRegion) liveRegion.textContent = 'No results found';
+        return;
+    }
+
+    const html = results.map((result, index) => {
+        const titleHtml = highlightText(result.title, query);
+        const previewHtml = highlightText(result.preview, query);
+        const selectedClass = index === selectedIndex ? ' selected' : '';
+        const ariaSelected = index === selectedIndex ? 'true' : 'false';
+        const resultId = 'search-result-' + index;
+
+        return `
+            <div class="search-result${selectedClass}" id="${resultId}" role="option" aria-selected="${ariaSelected}" data-index="${index}" data-page="${result.pageId}" data-section="${result.sectionId}">
+                ${result.section ? `<div class="search-result-section">${result.section}</div>` : ''}
+                <div class="search-result-title">${titleHtml}</div>
+                ${result.matchedHeading ? `<div class="search-result-preview">${highlightText(result.matchedHeading, query)}</div>` : ''}
+                <div class="search-result-preview">${previewHtml}</div>
+            </div>
+        `;
+    }).join('');
+
+    searchResults.innerHTML = html;
+    searchInput.setAttribute('aria-expanded', 'true');
+
+    // Update active descendant for screen readers
+    if (selectedIndex >= 0) {
+        searchInput.setAttribute('aria-activedescendant', 'search-result-' + selectedIndex);
+    } else {
+        searchInput.removeAttribute('aria-activedescendant');
+    }
+
+    // Announce result count to screen readers
+    if (liveRegion) {
+        liveRegion.textContent = results.length + ' result' + (results.length === 1 ? '' : 's') + ' found';
+    }
+
+    // Add click handlers
+    searchResults.querySelectorAll('.search-result').forEach(el => {
+        el.addEventListener('click', () => {
+            openPage(el.dataset.page, el.dataset.section);
+            closeSearch();
+        });
+    });
+}
+
+// Show search results
+function showResults() {
+    searchResults.classList.add('active');
+}
+
+// Hide search results
+function hideResults() {
+    searchResults.classList.remove('active');
+    searchInput.setAttribute('aria-expanded', 'false');
+    searchInput.removeAttribute('aria-activedescendant');
+    selectedIndex = -1;
+}
+
+// Close search (mobile)
+function closeSearch() {
+    hideResults();
+    searchInput.value = '';
+    searchInput.blur();
+    if (window.innerWidth < 769) {
+        searchContainer.classList.remove('active');
+    }
+}
+
+// Debounce function
+function debounce(func, wait) {
+    let timeout;
+    return function executedFunction(...args) {
+        const later = () => {
+            clearTimeout(timeout);
+            func(...args);
+        };
+        clearTimeout(timeout);
+        timeout = setTimeout(later, wait);
+    };
+}
+
+// Handle search input
+const handleSearch = debounce(async (query) => {
+    let results = [];
+    try {
+        results = await search(query);
+    } catch (err) {
+        console.error('Search failed:', err);
+    }
+    // Ignore results for a query the user has already typed past
+    if (query !== searchInput.value) return;
+    currentResults = results;
+    if (query.length >= 2) {
+        renderResults(currentResults, query);
+        showResults();
+    } else {
+        hideResults();
+    }
+}, 150);
+
+searchInput.addEventListener('input', (e) => {
+    handleSearch(e.target.value);
+});
+
+// Handle keyboard navigation
+searchInput.addEventListener('keydown', (e) => {
+    if (!searchResults.classList.contains('active')) return;
+
+    if (e.key === 'ArrowDown') {
+        e.preventDefault();
+        selectedIndex = Math.min(selectedIndex + 1, currentResults.length - 1);
+        renderResults(currentResults, searchInput.value);
+    } else if (e.key === 'ArrowUp') {
+        e.preventDefault();
+        selectedIndex = Math.max(selectedIndex - 1, -1);
+        renderResults(currentResults, searchInput.value);
+    } else if (e.key === 'Enter') {
+        e.preventDefault();
+        if (selectedIndex >= 0 && currentResults[selectedIndex]) {
+            openPage(currentResults[selectedIndex].pageId, currentResults[selectedIndex].sectionId);
+            closeSearch();
+        } else if (currentResults.length > 0) {
+            openPage(currentResults[0].pageId, currentResults[0].sectionId);
+            closeSearch();
+        }
+    } else if (e.key === 'Escape') {
+        closeSearch();
+    }
+});
+
+// Close results when clicking outside
+document.addEventListener('click', (e) => {
+    if (!searchContainer.contains(e.target)) {
+        hideResults();
+    }
+});
+
+// Focus search on input click
+searchInput.addEventListener('focus', () => {
+    // Start decoding early; a failure is reported by the search itself
+    loadSearchIndex().catch(() => {});
+    if (searchInput.value.length >= 2) {
+        handleSearch(searchInput.value);
+    }
+});
+
+// Global keyboard shortcut (Ctrl+K or Cmd+K)
+document.addEventListener('keydown', (e) => {
+    if ((e.ctrlKey || e.metaKey) && e.key === 'k') {
+        e.preventDefault();
+        if (window.innerWidth < 769) {
+            searchContainer.classList.add('active');
+        }
+        searchInput.focus();
+    }
+    if (e.key === 'Escape') {
+        closeSearch();
+    }
+});
+
+// Mobile search toggle
+if (searchToggle) {
+    searchToggle.addEventListener('click', () => {
+        searchContainer.classList.toggle('active');
+        if (searchContainer.classList.contains('active')) {
+            searchInput.focus();
+        }
+    });
+}
+
+// Language switcher
+function switchLanguage(filename) {
+    const currentHash = window.location.hash;
+    window.location.href = filename + currentHash;
+}
+
+// Load initial page (site pages arrive prerendered)
+if (SITE) {
+    currentPageId = SITE.page;
+    renderSeeAlso(SITE.page);
+    if (SITE.clientNav) {
+        prefetchNeighbours(SITE.page);
+    }
+} else {
+    const initialHash = currentHash();
+    const firstPageId = PAGE_LIST[0].id;
+    if (initialHash) {
+        navigateToHash(initialHash);
+    } else {
+        loadPage(firstPageId);
+    }
+}
@@ -13,6 +13,7 @@ Usage:
     python build_docs.py           # Build English docs (default)
     python build_docs.py --lang zh # Build Chinese docs
     python build_docs.py --lang all # Build all available languages
+    python build_docs.py query "string split" --lang en  # Search the built docs
 
 The hemlock submodule must be initialized before running this script:
     git submodule update --init --recursive
@@ -23,7 +24,20 @@ import sys
 import json
 import base64
 import re
+import zlib
+import hashlib
+import heapq
+import math
+import tempfile
+import textwrap
 import argparse
+import atexit
+import fnmatch
+import subprocess
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Paths to submodules and translations
@@ -31,8 +45,17 @@ HEMLOCK_DIR = Path(__file__).parent / 'hemlock'
 HPM_DIR = Path(__file__).parent / 'hpm'
 TRANSLATIONS_DIR = Path(__file__).parent / 'translations'
 WELCOME_DIR = Path(__file__).parent / 'welcome'
+ASSETS_DIR = Path(__file__).parent / 'assets'
+BUILD_CACHE_DIR = Path(__file__).parent / '.build-cache'
+STORE_DIR = Path(__file__).parent / 'store'
+SITE_DIR = Path(__file__).parent / 'site'
+VERSIONS_DIR = Path(__file__).parent / 'versions'
 OUTPUT_FILE = Path(__file__).parent / 'docs.html'
 LLM_OUTPUT_FILE = Path(__file__).parent / 'llms.txt'
+LLM_CHUNKS_DIR = Path(__file__).parent / 'llms'
+CORPUS_DIR = Path(__file__).parent / 'corpus'
+LLM_DELTA_DIR = Path(__file__).parent / 'llms-delta'
+SEARCH_DB_FILE = Path(__file__).parent / 'docs.sqlite'
 
 # Supported languages with display names
 SUPPORTED_LANGUAGES = {
@@ -756,11 +779,150 @@ def transform_claude_md_for_humans(content, lang):
     return content
 
 
+class GitTree:
+    """The files of one commit, read from a git object database.
+
+    Lets the build use a submodule at any revision without checking it
+    out. Blobs are streamed through one long-lived `git cat-file --batch`
+    process per repository and cached by object id, so content shared
+    between languages, revisions and trees is read once per run.
+    """
+
+    _processes = {}  # git dir -> (cat-file process, lock)
+    _processes_lock = threading.Lock()  # Pages are read from several threads
+    _blobs = {}  # object id -> bytes
+
+    def __init__(self, git_dir, ref):
+        self.git_dir = Path(git_dir)
+        self.ref = ref
+        self.commit = self._git('rev-parse', '--verify', '--quiet', f'{ref}^{{commit}}').strip()
+        self.files = {}  # path -> blob id
+        self.dirs = {''}
+        for entry in self._git('ls-tree', '-r', '-z', '--full-tree', self.commit).split('\0'):
+            meta, _, path = entry.partition('\t')
+            if not path or meta.split()[1] != 'blob':
+                continue
+            self.files[path] = meta.split()[2]
+            parts = path.split('/')
+            self.dirs.update('/'.join(parts[:i]) for i in range(1, len(parts)))
+
+    def _git(self, *args):
+        result = subprocess.run(['git', f'--git-dir={self.git_dir}', *args],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise ValueError(result.stderr.strip() or f'{self.ref} is not a commit in {self.git_dir}')
+        return result.stdout
+
+    def exists(self, path):
+        return path in self.files or path in self.dirs
+
+    def list_dir(self, path):
+        """Names of the files directly inside directory path."""
+        prefix = f'{path}/' if path else ''
+        return sorted(name[len(prefix):] for name in self.files
+                      if name.startswith(prefix) and '/' not in name[len(prefix):])
+
+    def read(self, path):
+        """Bytes of the file at path (OSError if it is not in the tree)."""
+        oid = self.files.get(path)
+        if oid is None:
+            raise FileNotFoundError(f'{path} not found in {self.ref}')
+        if oid not in GitTree._blobs:
+            GitTree._blobs[oid] = self._cat_file(oid)
+        return GitTree._blobs[oid]
+
+    def _cat_file(self, oid):
+        key = str(self.git_dir)
+        with GitTree._processes_lock:
+            if key not in GitTree._processes:
+                process = subprocess.Popen(['git', f'--git-dir={self.git_dir}', 'cat-file', '--batch'],
+                                           stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+                GitTree._processes[key] = (process, threading.Lock())
+            process, lock = GitTree._processes[key]
+        with lock:
+            process.stdin.write(oid.encode('ascii') + b'\n')
+            process.stdin.flush()
+            # <oid> <type> <size>, then the content and a newline
+            header = process.stdout.readline().split()
+            if len(header) != 3:
+                raise OSError(f'git cat-file could not read {oid}')
+            data = process.stdout.read(int(header[2]))
+            process.stdout.read(1)
+        return data
+
+    @classmethod
+    def close(cls):
+        """End the cat-file processes (a later read starts new ones)."""
+        with cls._processes_lock:
+            for process, lock in cls._processes.values():
+                with lock:
+                    process.stdin.close()
+                    process.wait()
+                    process.stdout.close()
+            cls._processes.clear()
+
+
+# Let the cat-file processes exit when the build finishes
+atexit.register(GitTree.close)
+
+
+# Source directories read from git objects instead of the working tree
+# (--hemlock-ref/--hpm-ref): {directory: GitTree}
+GIT_TREES = {}
+
+
+def submodule_git_dir(path):
+    """The git directory holding a submodule's objects, or None.
+
+    Works for checked out submodules and for ones that were only
+    initialised and fetched (objects in .git/modules/<name>).
+    """
+    dot_git = Path(path) / '.git'
+    if dot_git.is_dir():
+        return dot_git
+    if dot_git.is_file():
+        line = dot_git.read_text(encoding='utf-8').strip()
+        if line.startswith('gitdir:'):
+            return (Path(path) / line[len('gitdir:'):].strip()).resolve()
+    modules_dir = Path(__file__).parent / '.git' / 'modules' / Path(path).name
+    return modules_dir if modules_dir.is_dir() else None
+
+
+def _git_tree_for(path):
+    """The GitTree a path is read from and the path within it, or (None, None)."""
+    for directory, tree in GIT_TREES.items():
+        try:
+            name = Path(path).relative_to(directory).as_posix()
+        except ValueError:
+            continue
+        return tree, '' if name == '.' else name
+    return None, None
+
+
+def source_exists(path):
+    """Whether a source file or directory exists (in git or on disk)."""
+    tree, name = _git_tree_for(path)
+    return tree.exists(name) if tree else Path(path).exists()
+
+
+def list_markdown(directory):
+    """The .md files directly inside a source directory, sorted."""
+    tree, name = _git_tree_for(directory)
+    if tree is None:
+        return sorted(Path(directory).glob('*.md'))
+    return [Path(directory) / file for file in tree.list_dir(name) if file.endswith('.md')]
+
+
+def read_source(path):
+    """Bytes of a source file (from git or disk)."""
+    tree, name = _git_tree_for(path)
+    return tree.read(name) if tree else Path(path).read_bytes()
+
+
 def read_file(path):
     """Read file content."""
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return read_source(path).decode('utf-8')
     except Exception as e:
         print(f"Warning: Could not read {path}: {e}")
         return ""
@@ -827,14 +989,297 @@ def smart_title(text):
     return result
 
 
+MANIFEST_NAME = 'build-manifest.json'
+
+# sha256 of each source file read during this run (path -> hex digest)
+_source_digests = {}
+
+
+def relative_path(path, base_dir=Path(__file__).parent):
+    """Path relative to base_dir in POSIX form (as recorded in manifests)."""
+    path = Path(path)
+    try:
+        return path.relative_to(base_dir).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def source_digest(path):
+    """sha256 of a source file's bytes, computed once per run."""
+    key = str(path)
+    if key not in _source_digests:
+        try:
+            _source_digests[key] = hashlib.sha256(read_source(path)).hexdigest()
+        except OSError:
+            _source_digests[key] = ''
+    return _source_digests[key]
+
+
+def write_artifact(path, data, manifest=None, sources=(), **info):
+    """Write an output file atomically, skipping it if the bytes are unchanged.
+
+    Data is written to a temporary file in the same directory and renamed
+    over path, so readers never see a partial file. With a manifest (see
+    load_manifest()), the artifact's hash, size, sources and any extra info
+    (language, page count) are recorded in it. Returns True if the file
+    was written.
+    """
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    if manifest is not None:
+        record_artifact(manifest, path, hashlib.sha256(data).hexdigest(), len(data), sources, info)
+
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        replace_file(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return True
+
+
+# The process umask; reading it means setting it, so this is done once
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def replace_file(tmp_name, path):
+    """Rename a finished temporary file over path.
+
+    mkstemp() creates files readable by their owner only, so the file
+    first gets path's current mode, or the mode a plain open() would
+    give a new file.
+    """
+    try:
+        mode = path.stat().st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~UMASK
+    os.chmod(tmp_name, mode)
+    os.replace(tmp_name, path)
+
+
+def record_artifact(manifest, path, sha256, size, sources=(), info=None):
+    """Add an artifact's hash, size, sources and extra info to manifest."""
+    source_names = []
+    for source in sources:
+        name = relative_path(source)
+        manifest['sources'][name] = source_digest(source)
+        source_names.append(name)
+    entry = {'sha256': sha256, 'size': size, **(info or {})}
+    if source_names:
+        entry['sources'] = sorted(set(source_names))
+    manifest['artifacts'][relative_path(path, manifest['base'])] = entry
+
+
+def stream_artifact(path, pieces, manifest=None, sources=(), **info):
+    """Like write_artifact(), for output produced piece by piece.
+
+    The pieces (strings) are streamed to a temporary file while being
+    hashed, so the output is never held in memory as a whole. The file is
+    then renamed over path, unless path already has the same content.
+    Returns (written, sha256 hex digest).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for piece in pieces:
+                data = piece.encode('utf-8')
+                digest.update(data)
+                size += len(data)
+                f.write(data)
+        sha256 = digest.hexdigest()
+        if manifest is not None:
+            record_artifact(manifest, path, sha256, size, sources, info)
+        if path.exists() and file_sha256(path) == sha256:
+            os.unlink(tmp_name)
+            return False, sha256
+        replace_file(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    return True, sha256
+
+
+def file_sha256(path):
+    """sha256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Hash of this builder; part of every .build-cache/ key, so entries made by
+# another version of the parser, highlighter or minifiers are not reused
+BUILDER_DIGEST = file_sha256(__file__)[:16]
+
+# .build-cache/ entries this run uses (see prune_build_cache())
+_cache_entries = set()
+
+
+def cache_path(name):
+    """Path of the .build-cache/ entry name, noting that this run uses it."""
+    _cache_entries.add(name)
+    return BUILD_CACHE_DIR / name
+
+
+def load_manifest(base_dir):
+    """Load base_dir/build-manifest.json, or start an empty one.
+
+    Entries for artifacts not rebuilt in this run are kept, so single
+    language builds update the manifest in place. Besides artifacts and
+    source hashes, the manifest maps each language's page ids to their
+    source files; together they form the dependency graph used by
+    --changed (see dependency_graph()), and lists the page store entries
+    and .build-cache/ entries each language (of each version) refers to
+    (see prune_store() and prune_build_cache()).
+    """
+    try:
+        with open(base_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    return {
+        'base': base_dir,
+        'sources': data.get('sources', {}),
+        'artifacts': data.get('artifacts', {}),
+        'pages': data.get('pages', {}),
+        'store': data.get('store', {}),
+        'cache': data.get('cache', {}),
+    }
+
+
+def save_manifest(manifest):
+    """Write the manifest, dropping sources no artifact refers to any more."""
+    artifacts = dict(sorted(manifest['artifacts'].items()))
+    referenced = {name for entry in artifacts.values() for name in entry.get('sources', [])}
+    sources = {name: digest for name, digest in sorted(manifest['sources'].items()) if name in referenced}
+    pages = dict(sorted(manifest['pages'].items()))
+    data = {'version': 1, 'sources': sources, 'artifacts': artifacts, 'pages': pages}
+    if manifest['store']:
+        data['store'] = dict(sorted(manifest['store'].items()))
+    if manifest['cache']:
+        data['cache'] = dict(sorted(manifest['cache'].items()))
+    return write_artifact(manifest['base'] / MANIFEST_NAME,
+                          json.dumps(data, indent=2, ensure_ascii=False) + '\n')
+
+
+# Inputs that affect every language's output
+BUILD_INPUTS = ('build_docs.py', 'assets/', 'hemlock/logo.png')
+
+
+def dependency_graph(manifest):
+    """Map each source file to the pages, languages and artifacts built from it.
+
+    Pages are reported as "<lang>/<page-id>". A translated page is also
+    credited to the English original it translates, since deleting or
+    renaming the original removes the page from every language.
+    """
+    graph = {}
+
+    def node(source):
+        return graph.setdefault(source, {'pages': set(), 'languages': set(), 'artifacts': set()})
+
+    translations_prefix = TRANSLATIONS_DIR.name + '/'
+    for lang, pages in manifest['pages'].items():
+        for page_id, source in pages.items():
+            sources = [source]
+            if source.startswith(f'{translations_prefix}{lang}/'):
+                sources.append(source.split('/', 2)[2])
+            for path in sources:
+                entry = node(path)
+                entry['pages'].add(f'{lang}/{page_id}')
+                entry['languages'].add(lang)
+    for name, artifact in manifest['artifacts'].items():
+        for source in artifact.get('sources', []):
+            entry = node(source)
+            entry['artifacts'].add(name)
+            if 'lang' in artifact:
+                entry['languages'].add(artifact['lang'])
+    return graph
+
+
+def git_changed_paths(rev_range):
+    """Paths changed in a git range, including files inside bumped submodules."""
+    root = Path(__file__).parent
+    result = subprocess.run(['git', 'diff', '--raw', '--no-abbrev', '--no-renames', rev_range],
+                            cwd=root, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ValueError(result.stderr.strip() or f'git diff {rev_range} failed')
+
+    paths = []
+    for line in result.stdout.splitlines():
+        meta, _, path = line.partition('\t')
+        # :<old mode> <new mode> <old sha> <new sha> <status>
+        old_mode, new_mode, old_sha, new_sha = meta.lstrip(':').split()[:4]
+        if '160000' in (old_mode, new_mode):
+            # Submodule bump: list the files changed between the two commits
+            sub = subprocess.run(['git', '-C', str(root / path), 'diff', '--name-only', old_sha, new_sha],
+                                 capture_output=True, text=True)
+            if sub.returncode == 0:
+                paths.extend(f'{path}/{name}' for name in sub.stdout.splitlines())
+                continue
+        paths.append(path)
+    return paths
+
+
+def affected_languages(changed_paths, manifest):
+    """Work out which languages must be rebuilt for a set of changed paths.
+
+    Known sources are looked up in the dependency graph of the previous
+    build. New files are placed by location: a translation or welcome file
+    affects its language, a new hemlock/hpm doc affects all of them.
+    Returns {lang: [paths that affect it]}.
+    """
+    all_langs = list(SUPPORTED_LANGUAGES.keys())
+    graph = dependency_graph(manifest)
+    affected = {}
+
+    for path in changed_paths:
+        path = Path(path).as_posix()
+        parts = path.split('/')
+        if not manifest['artifacts'] or path.startswith(BUILD_INPUTS) or path in ('hemlock', 'hpm'):
+            langs = all_langs
+        elif path in graph:
+            langs = graph[path]['languages']
+        elif parts[0] == 'translations' and len(parts) > 2:
+            langs = [parts[1]]
+        elif parts[0] == 'welcome' and path.endswith('.md'):
+            langs = [Path(path).stem]
+        elif path == 'hemlock/CLAUDE.md' or path.startswith(('hemlock/docs/', 'hpm/docs/')):
+            langs = all_langs
+        else:
+            langs = []
+        for lang in langs:
+            if lang in SUPPORTED_LANGUAGES:
+                affected.setdefault(lang, []).append(path)
+
+    return {lang: affected[lang] for lang in all_langs if lang in affected}
+
+
 def encode_image(path):
     """Encode image as base64 data URL."""
     try:
-        with open(path, 'rb') as f:
-            data = base64.b64encode(f.read()).decode('utf-8')
-            ext = str(path).split('.')[-1].lower()
-            mime = 'image/png' if ext == 'png' else 'image/jpeg'
-            return f"data:{mime};base64,{data}"
+        data = base64.b64encode(read_source(path)).decode('utf-8')
+        ext = str(path).split('.')[-1].lower()
+        mime = 'image/png' if ext == 'png' else 'image/jpeg'
+        return f"data:{mime};base64,{data}"
     except Exception as e:
         print(f"Warning: Could not encode image {path}: {e}")
         return ""
@@ -895,51 +1340,81 @@ def convert_md_links(content, current_section):
     return re.sub(pattern, replace_link, content)
 
 
-def collect_docs(lang='en'):
+PREVIEW_STUB = '*This page is not part of this preview build.*\n'
+
+# Source files read at once by collect_docs(); reads are I/O bound, so this
+# can exceed the CPU count
+READ_WORKERS = 16
+
+
+def collect_docs(lang='en', include=None):
     """Collect all documentation files from hemlock and hpm submodules.
 
     Args:
         lang: Language code ('en', 'zh', etc.). Will use translations if available.
+        include: Optional predicate on page ids for subset builds. Pages it
+            rejects are not read; they become stubs (marked 'stub') so that
+            navigation and links to them still resolve.
+
+    Each page's 'document' holds its parsed document model (see
+    parse_document()).
     """
     docs = {}
     translation_stats = {'translated': 0, 'fallback': 0}
+    # (docs key, read function) of the pages to read once all are found
+    pending = []
+
+    def is_stub(doc_id):
+        return include is not None and not include(doc_id)
+
+    def add_page(key, doc_id, order, section, source, read):
+        """Add a page to docs and queue read() for its content.
+
+        Stubs get placeholder content and are not read. Returns whether
+        the page is a stub.
+        """
+        stub = is_stub(doc_id)
+        docs[key] = {
+            'id': doc_id,
+            'content': PREVIEW_STUB if stub else None,
+            'order': order,
+            'section': section,
+            'source': source,
+            'stub': stub,
+        }
+        if not stub:
+            pending.append((key, read))
+        return stub
+
+    def reader(path, link_section, transform=None):
+        def read():
+            content, is_translated = read_file_with_translation(path, lang)
+            if transform is not None:
+                content = transform(content, lang)
+            return convert_md_links(content, link_section), is_translated
+        return read
 
     # Add Welcome page first (from welcome/ directory, built into hem-doc)
     welcome_file = WELCOME_DIR / f'{lang}.md'
     if not welcome_file.exists():
         welcome_file = WELCOME_DIR / 'en.md'  # Fallback to English
-    welcome_content = read_file(welcome_file)
     welcome_title = WELCOME_TITLE_TRANSLATIONS.get(lang, WELCOME_TITLE_TRANSLATIONS['en'])
-    docs[welcome_title] = {
-        'id': 'welcome',
-        'content': welcome_content,
-        'order': -1,  # Ensure it's first
-        'section': ''
-    }
-    translation_stats['translated'] += 1
+    # The welcome page is chosen per language already and always counts as
+    # translated; order -1 ensures it's first
+    if add_page(welcome_title, 'welcome', -1, '', welcome_file, lambda: (read_file(welcome_file), True)):
+        translation_stats['translated'] += 1
 
     # Add CLAUDE.md as the main documentation
     claude_path = HEMLOCK_DIR / 'CLAUDE.md'
-    if claude_path.exists():
-        content, is_translated = read_file_with_translation(claude_path, lang)
+    if source_exists(claude_path):
         # Transform AI-directed content to human-readable documentation
-        content = transform_claude_md_for_humans(content, lang)
-        content = convert_md_links(content, 'language-reference')
-        title = translate_section('Language Reference', lang)
-        docs[title] = {
-            'id': 'language-reference',
-            'content': content,
-            'order': 0,
-            'section': ''
-        }
-        if is_translated:
-            translation_stats['translated'] += 1
-        else:
-            translation_stats['fallback'] += 1
+        add_page(translate_section('Language Reference', lang), 'language-reference', 0, '',
+                 get_translated_path(claude_path, lang),
+                 reader(claude_path, 'language-reference', transform_claude_md_for_humans))
 
     # Collect docs from hemlock/docs/ directory
     docs_dir = HEMLOCK_DIR / 'docs'
-    if docs_dir.exists():
+    if source_exists(docs_dir):
         sections = {
             'getting-started': ('Getting Started', 1),
             'language-guide': ('Language Guide', 2),
@@ -951,12 +1426,12 @@ def collect_docs(lang='en'):
 
         for subdir, (section_name, order) in sections.items():
             subdir_path = docs_dir / subdir
-            if not subdir_path.exists():
+            if not source_exists(subdir_path):
                 continue
 
             translated_section = translate_section(section_name, lang)
 
-            for md_file in sorted(subdir_path.glob('*.md')):
+            for md_file in list_markdown(subdir_path):
                 # Skip development docs
                 if 'development' in str(md_file):
                     continue
@@ -967,24 +1442,12 @@ def collect_docs(lang='en'):
                 translated_title = translate_title(title, lang)
                 doc_id = f"{subdir}-{file_name}"
 
-                content, is_translated = read_file_with_translation(md_file, lang)
-                content = convert_md_links(content, subdir)
-
-                docs[f"{translated_section} -> {translated_title}"] = {
-                    'id': doc_id,
-                    'content': content,
-                    'order': order,
-                    'section': translated_section
-                }
-
-                if is_translated:
-                    translation_stats['translated'] += 1
-                else:
-                    translation_stats['fallback'] += 1
+                add_page(f"{translated_section} -> {translated_title}", doc_id, order, translated_section,
+                         get_translated_path(md_file, lang), reader(md_file, subdir))
 
     # Collect hpm documentation
     hpm_docs_dir = HPM_DIR / 'docs'
-    if hpm_docs_dir.exists():
+    if source_exists(hpm_docs_dir):
         # hpm documentation structure - order starts at 10 to appear after hemlock docs
         hpm_sections = {
             # Getting Started docs
@@ -1004,7 +1467,7 @@ def collect_docs(lang='en'):
             'exit-codes': ('hpm: Reference', 13),
         }
 
-        for md_file in sorted(hpm_docs_dir.glob('*.md')):
+        for md_file in list_markdown(hpm_docs_dir):
             file_name = md_file.stem
             # Skip the README as it's an index
             if file_name.lower() == 'readme':
@@ -1022,16 +1485,14 @@ def collect_docs(lang='en'):
             translated_title = translate_title(title, lang)
             doc_id = f"hpm-{file_name}"
 
-            content, is_translated = read_file_with_translation(md_file, lang)
-            content = convert_md_links(content, f"hpm-{file_name}")
-
-            docs[f"{translated_section} -> {translated_title}"] = {
-                'id': doc_id,
-                'content': content,
-                'order': order,
-                'section': translated_section
-            }
+            add_page(f"{translated_section} -> {translated_title}", doc_id, order, translated_section,
+                     get_translated_path(md_file, lang), reader(md_file, f"hpm-{file_name}"))
 
+    # Read every page concurrently; map() keeps the results in discovery order
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        results = pool.map(lambda read: read(), [read for _, read in pending])
+        for (key, _), (content, is_translated) in zip(pending, results):
+            docs[key]['content'] = content
             if is_translated:
                 translation_stats['translated'] += 1
             else:
@@ -1040,6 +1501,10 @@ def collect_docs(lang='en'):
     # Sort by order, then by name
     sorted_docs = dict(sorted(docs.items(), key=lambda x: (x[1]['order'], x[0])))
 
+    # Parse each page once; every emitter works from the document model
+    for info in sorted_docs.values():
+        info['document'] = load_document(info['content'])
+
     # Print translation stats for non-English builds
     if lang != 'en':
         total = translation_stats['translated'] + translation_stats['fallback']
@@ -1049,16 +1514,996 @@ def collect_docs(lang='en'):
     return sorted_docs
 
 
-def generate_html(docs, logo_data, lang='en'):
-    """Generate the complete HTML document.
+# Scripts that are written without spaces between words (Hiragana, Katakana,
+# CJK ideographs and halfwidth Katakana). Runs of these are indexed as
+# character bigrams instead of whitespace-delimited words.
+CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f'
 
-    Args:
-        docs: Dictionary of documentation pages
-        logo_data: Base64 encoded logo image
-        lang: Language code for this build
+# A token is either a run of CJK characters or a run of other word characters.
+# Splitting on script boundaries keeps Hemlock identifiers embedded in Chinese
+# or Japanese prose (e.g. "使用read_file函数") searchable as words.
+SEARCH_TOKEN_RE = re.compile(f'([{CJK_CHARS}]+)|((?:(?![{CJK_CHARS}])\\w)+)')
+
+
+def tokenize_for_search(text):
+    """Split text into the set of search terms used by the search index.
+
+    Latin, Cyrillic and other space-delimited scripts produce lowercase words;
+    identifiers containing underscores additionally produce their parts.
+    CJK runs produce overlapping character bigrams (a lone character is kept
+    as a unigram). The viewer's tokenize() must stay in sync with this.
+    """
+    return set(search_terms(text))
+
+
+def search_terms(text):
+    """Yield the search terms of text in order, repeats included.
+
+    The terms are those of tokenize_for_search(); the search database
+    indexes them as space-separated words so that term frequencies count.
+    """
+    for match in SEARCH_TOKEN_RE.finditer(text.lower()):
+        cjk, word = match.groups()
+        if cjk:
+            if len(cjk) == 1:
+                yield cjk
+            yield from (cjk[i:i + 2] for i in range(len(cjk) - 1))
+        else:
+            yield word
+            if '_' in word:
+                yield from (part for part in word.split('_') if part)
+
+
+def to_base36(n):
+    """Format a non-negative integer in base 36."""
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    result = ''
+    while True:
+        n, r = divmod(n, 36)
+        result = digits[r] + result
+        if n == 0:
+            return result
+
+
+def extract_page_links(docs):
+    """Find the pages each page links to.
+
+    Works on content that has been through convert_md_links(), so links to
+    other pages target #page-id. Returns {page id: [linked page ids]}
+    in order of first appearance, skipping self-links and unknown ids.
+    """
+    page_ids = {info['id'] for info in docs.values()}
+    links = {}
+    for info in docs.values():
+        targets = []
+        for link in info['document']['links']:
+            target = link['target'][1:]
+            if (link['target'].startswith('#') and target in page_ids
+                    and target != info['id'] and target not in targets):
+                targets.append(target)
+        links[info['id']] = targets
+    return links
+
+
+# "See also" pages listed under each page, and the lowest cosine similarity
+# for a page to be listed
+RELATED_PAGES = 5
+RELATED_MIN_SCORE = 0.05
+
+# Terms in more than this fraction of pages say little about what a page
+# is about and are left out of the similarity vectors, which keep only
+# the heaviest RELATED_TERMS terms of each page
+RELATED_MAX_DF = 0.5
+RELATED_TERMS = 128
+
+# Bump when related_pages() output changes so stale cache entries are not reused
+RELATED_CACHE_VERSION = '1'
+RELATED_CACHE_DIR = BUILD_CACHE_DIR / 'related'
+
+
+def related_pages(docs, k=RELATED_PAGES, exclude=None):
+    """Find the k pages most similar to each page.
+
+    Pages are TF-IDF vectors (sublinear term frequency) of their title and
+    text terms, cut down to their heaviest terms and normalised to unit
+    length; terms in one page or in most pages are dropped. Cosine
+    similarities come from the sparse product of the page-term matrix with
+    its transpose, computed through an inverted index so only pages sharing
+    a term are ever compared. The short vectors keep the postings short, so
+    the cost grows about linearly with the number of pages. Pages listed
+    in exclude ({page id: [page ids]}, e.g. the pages it already links to)
+    are skipped. Returns {page id: [related page ids]}, most similar first.
+    """
+    page_ids = [info['id'] for info in docs.values()]
+    counts = [
+        Counter(search_terms(f"{title.split(' -> ')[-1]}\n{info['document']['text']}"))
+        for title, info in docs.items()
+    ]
+    df = Counter(term for terms in counts for term in terms)
+    max_df = max(2, len(page_ids) * RELATED_MAX_DF)
+    idf = {term: math.log(len(page_ids) / n) for term, n in df.items() if 2 <= n <= max_df}
+
+    postings = {}  # term -> [(page index, weight)]
+    vectors = []
+    for index, terms in enumerate(counts):
+        vector = dict(heapq.nlargest(RELATED_TERMS, (
+            (term, (1 + math.log(n)) * idf[term]) for term, n in terms.items() if term in idf
+        ), key=lambda item: item[1]))
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        vector = {term: w / norm for term, w in vector.items()}
+        vectors.append(vector)
+        for term, w in vector.items():
+            postings.setdefault(term, []).append((index, w))
+
+    related = {}
+    for index, vector in enumerate(vectors):
+        skip = set((exclude or {}).get(page_ids[index], ()))
+        scores = {}
+        for term, w in vector.items():
+            for other, other_w in postings[term]:
+                scores[other] = scores.get(other, 0.0) + w * other_w
+        best = heapq.nlargest(k, (
+            (score, other) for other, score in scores.items()
+            if other != index and score >= RELATED_MIN_SCORE and page_ids[other] not in skip
+        ))
+        related[page_ids[index]] = [page_ids[other] for _, other in best]
+    return related
+
+
+def load_related_pages(docs, exclude=None):
+    """related_pages() of docs, cached on disk until a page changes.
+
+    Entries live in .build-cache/related/ keyed by a hash of every input:
+    the page ids, titles and content hashes, the excluded pages, the tuning
+    constants and the builder, so unchanged languages skip the computation.
+    """
+    key_data = json.dumps([
+        BUILDER_DIGEST, RELATED_CACHE_VERSION, RELATED_PAGES, RELATED_MIN_SCORE, RELATED_MAX_DF, RELATED_TERMS,
+        [[info['id'], title, content_hash(info['document']['text'])] for title, info in docs.items()],
+        exclude,
+    ], ensure_ascii=False)
+    key = hashlib.sha256(key_data.encode('utf-8')).hexdigest()[:24]
+    path = cache_path(f'related/{key}.json')
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        related = related_pages(docs, exclude=exclude)
+        write_artifact(path, json.dumps(related, ensure_ascii=False, separators=(',', ':')))
+        return related
+
+
+def check_links(docs):
+    """Find links that the viewer cannot resolve.
+
+    A link resolves if it is external, or targets a page id, a heading on
+    the same page, or #page-id/heading on another page. Returns a list of
+    (page id, target) pairs for the others, in page order.
+    """
+    headings = {info['id']: {h['id'] for h in info['document']['headings']}
+                for info in docs.values()}
+    broken = []
+    for info in docs.values():
+        for link in info['document']['links']:
+            target = link['target']
+            if target.startswith(('http://', 'https://', 'mailto:')):
+                continue
+            page_id, _, heading_id = target[1:].partition('/')
+            if target.startswith('#') and (
+                    (page_id in headings and heading_id in headings[page_id] | {''})
+                    or (not heading_id and page_id in headings[info['id']])):
+                continue
+            broken.append((info['id'], target))
+    return broken
+
+
+def make_heading_id(text, used_ids):
+    """Slug a heading the same way as the viewer's makeId()/uniqueId().
+
+    Repeated headings on one page get -1, -2, ... suffixes; used_ids tracks
+    the slugs already handed out for the page.
+    """
+    base = re.sub(r'[^\w\s-]', '', text.lower())
+    base = re.sub(r'\s+', '-', base).strip('-') or 'section'
+    count = used_ids.get(base, 0)
+    used_ids[base] = count + 1
+    return f'{base}-{count}' if count else base
+
+
+def utf16_len(text):
+    """Length of text in UTF-16 code units (JavaScript string length)."""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def build_search_index(docs):
+    """Build the section-level inverted search index embedded in the viewer.
+
+    Returns a dict with:
+        pages: page ids, in navigation order
+        sections: [page number, anchor id, heading, offset, length] per
+                  section; offset/length locate the section in the page
+                  content (UTF-16 code units)
+        width: number of base36 digits per posting entry
+        terms: sorted list of search terms
+        postings: one string per term, a concatenation of fixed-width base36
+                  section numbers containing that term
+    """
+    page_ids = []
+    sections = []
+    postings = {}
+    for title, info in docs.items():
+        page_num = len(page_ids)
+        page_ids.append(info['id'])
+        for i, section in enumerate(info['document']['sections']):
+            section_num = len(sections)
+            sections.append([page_num, section['id'], section['heading'],
+                             section['offset'], section['length']])
+            text = section['text']
+            if i == 0:
+                text = title + '\n' + text
+            for term in tokenize_for_search(text):
+                postings.setdefault(term, []).append(section_num)
+
+    width = len(to_base36(max(len(sections) - 1, 0)))
+    # Order terms by UTF-16 code units, which is how the viewer compares strings
+    terms = sorted(postings, key=lambda term: term.encode('utf-16-be'))
+    return {
+        'pages': page_ids,
+        'sections': sections,
+        'width': width,
+        'terms': terms,
+        'postings': [
+            ''.join(to_base36(n).rjust(width, '0') for n in postings[term])
+            for term in terms
+        ],
+    }
+
+
+# Bump when the minifiers change so stale cache entries are not reused
+MINIFIER_VERSION = '1'
+
+CSS_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|[^"\'/]+|/', re.S)
+
+# Keywords after which a '/' starts a regex literal rather than a division
+JS_REGEX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+
+JS_WORD_RE = re.compile(r'[\w$]')
+
+
+def minify_css(css):
+    """Strip comments and insignificant whitespace from a stylesheet."""
+    # Drop comments first so whitespace on either side of one collapses
+    uncommented = ''.join(t for t in CSS_TOKEN_RE.findall(css) if not t.startswith('/*'))
+    result = []
+    for chunk in CSS_TOKEN_RE.findall(uncommented):
+        if chunk[0] in '"\'':
+            result.append(chunk)
+            continue
+        chunk = re.sub(r'\s+', ' ', chunk)
+        chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+        chunk = re.sub(r':\s+', ':', chunk)
+        result.append(chunk)
+    return ''.join(result).replace(';}', '}').strip()
+
+
+def _scan_js(src, pos=0, nested=False):
+    """Split JavaScript into (kind, text) tokens.
+
+    Kinds are 'ws' (whitespace and comments, text '\\n' when they span a
+    line break, else ' '), 'str', 'tpl', 're', 'id' and 'p' (one punctuator
+    character). Strings, template literals and regex literals are kept
+    verbatim. With nested=True, scanning stops after the '}' that closes a
+    template substitution; returns (tokens, end position).
+    """
+    tokens = []
+    depth = 0
+    n = len(src)
+
+    def regex_allowed():
+        for kind, text in reversed(tokens):
+            if kind == 'ws':
+                continue
+            return (kind == 'p' and text not in ')]') or (kind == 'id' and text in JS_REGEX_KEYWORDS)
+        return True
+
+    while pos < n:
+        c = src[pos]
+        if c.isspace() or src.startswith('//', pos) or src.startswith('/*', pos):
+            start = pos
+            while pos < n:
+                if src[pos].isspace():
+                    pos += 1
+                elif src.startswith('//', pos):
+                    end = src.find('\n', pos)
+                    pos = n if end < 0 else end
+                elif src.startswith('/*', pos):
+                    pos = src.index('*/', pos + 2) + 2
+                else:
+                    break
+            tokens.append(('ws', '\n' if '\n' in src[start:pos] else ' '))
+        elif c in '"\'':
+            end = pos + 1
+            while src[end] != c:
+                end += 2 if src[end] == '\\' else 1
+            tokens.append(('str', src[pos:end + 1]))
+            pos = end + 1
+        elif c == '`':
+            end = pos + 1
+            while src[end] != '`':
+                if src[end] == '\\':
+                    end += 2
+                elif src.startswith('${', end):
+                    _, end = _scan_js(src, end + 2, nested=True)
+                else:
+                    end += 1
+            tokens.append(('tpl', src[pos:end + 1]))
+            pos = end + 1
+        elif c == '/' and regex_allowed():
+            end = pos + 1
+            in_class = False
+            while in_class or src[end] != '/':
+                if src[end] == '\\':
+                    end += 1
+                elif src[end] == '[':
+                    in_class = True
+                elif src[end] == ']':
+                    in_class = False
+                end += 1
+            end += 1
+            while end < n and (src[end].isalnum() or src[end] == '_'):
+                end += 1
+            tokens.append(('re', src[pos:end]))
+            pos = end
+        elif c.isalnum() or c in '_$':
+            end = pos
+            while end < n and (src[end].isalnum() or src[end] in '_$'):
+                end += 1
+            tokens.append(('id', src[pos:end]))
+            pos = end
+        else:
+            if nested and c == '{':
+                depth += 1
+            elif nested and c == '}':
+                if depth == 0:
+                    return tokens, pos + 1
+                depth -= 1
+            tokens.append(('p', c))
+            pos += 1
+    return tokens, pos
+
+
+def minify_js(js):
+    """Strip comments and insignificant whitespace from a script.
+
+    Line breaks are kept wherever automatic semicolon insertion could
+    depend on them; only breaks after an operator or opening bracket, or
+    before a closing bracket or member access, are removed.
+    """
+    tokens, _ = _scan_js(js)
+    out = []
+    pending = None
+    for kind, text in tokens:
+        if kind == 'ws':
+            if out and pending != '\n':
+                pending = text
+            continue
+        if pending and out:
+            prev = out[-1]
+            if pending == '\n':
+                joined = ''.join(out[-2:])
+                if (prev[-1] in '{;,([=:?&|+-*%<>!~^' and not joined.endswith(('++', '--'))) \
+                        or text[0] in '}),;.:?]':
+                    pending = ' '
+            if pending == ' ':
+                if not ((JS_WORD_RE.match(prev[-1]) and JS_WORD_RE.match(text[0])) or
+                        (prev[-1] == text[0] and text[0] in '+-/')):
+                    pending = None
+            if pending:
+                out.append(pending)
+        out.append(text)
+        pending = None
+    return ''.join(out)
+
+
+def load_viewer_assets(minify=True):
+    """Read the viewer's stylesheet and scripts from assets/.
+
+    Minified output is cached in .build-cache/ keyed by the source and
+    builder hashes, so unchanged assets are minified once rather than on
+    every build. Returns
+    {name: (text, saved_bytes)} for 'css', 'js' and 'inflate'.
+    """
+    sources = {
+        'css': (ASSETS_DIR / 'viewer.css', minify_css),
+        'js': (ASSETS_DIR / 'viewer.js', minify_js),
+        'inflate': (ASSETS_DIR / 'inflate.js', minify_js),
+    }
+    assets = {}
+    for name, (path, minifier) in sources.items():
+        text = path.read_text(encoding='utf-8').rstrip('\n')
+        # Readable form, indented to sit inside the <style>/<script> element
+        readable = '\n'.join('        ' + line if line else '' for line in text.split('\n'))
+        if not minify:
+            assets[name] = (readable, 0)
+            continue
+        digest = hashlib.sha256(
+            f'{BUILDER_DIGEST}\0{MINIFIER_VERSION}\0{path.name}\0{text}'.encode('utf-8')).hexdigest()
+        cache_file = cache_path(f'{digest[:20]}{path.suffix}')
+        if cache_file.exists():
+            minified = cache_file.read_text(encoding='utf-8')
+        else:
+            minified = minifier(text)
+            write_artifact(cache_file, minified)
+        saved = len(readable.encode('utf-8')) - len(minified.encode('utf-8'))
+        assets[name] = (minified, saved)
+    return assets
+
+
+def json_for_script(value):
+    """Serialise value as JSON that is safe inside a <script> element."""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('<', '\\u003c')
+
+
+def content_hash(text):
+    """Content address of a page store entry."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:20]
+
+
+def add_to_store(store, text, suffix=''):
+    """Add text to the shared page store (hash -> text) and return its key.
+
+    Pages are keyed by hash alone (stored as <hash>.md); other entries
+    carry their file suffix in the key.
+    """
+    key = content_hash(text) + suffix
+    store[key] = text
+    return key
+
+
+def write_store(store, store_dir=STORE_DIR):
+    """Write page store entries that are not already on disk.
+
+    Entries are immutable (the file name is the hash of the content), so
+    existing files are left alone. Returns (written, total bytes).
+    """
+    written = 0
+    total = 0
+    for key, text in store.items():
+        data = text.encode('utf-8')
+        total += len(data)
+        path = store_dir / (key if '.' in key else f'{key}.md')
+        if not path.exists():
+            write_artifact(path, data)
+            written += 1
+    return written, total
+
+
+# Store entry file names: a content hash, with the entry's suffix
+STORE_ENTRY_RE = re.compile(r'[0-9a-f]{20}(\.md|\.json)')
+
+
+def prune_store(manifest, store_dir=STORE_DIR):
+    """Delete store entries that no built language refers to any more.
+
+    manifest['store'] maps each language (as "<version>/<lang>" for
+    version builds) to the keys of the entries its outputs use; languages
+    not rebuilt in this run keep theirs. Other files in store_dir (the
+    llms recipes) are left alone. Returns the number of entries deleted.
+    """
+    referenced = {key for keys in manifest['store'].values() for key in keys}
+    removed = 0
+    for path in store_dir.iterdir():
+        if not STORE_ENTRY_RE.fullmatch(path.name):
+            continue
+        key = path.stem if path.suffix == '.md' else path.name
+        if key not in referenced:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def prune_build_cache(manifest):
+    """Delete .build-cache/ entries that no build refers to any more.
+
+    manifest['cache'] maps each language (as "<version>/<lang>" for
+    version builds) and the viewer assets to the cached documents, related
+    pages and minified assets they used; languages not rebuilt in this run
+    keep theirs. Returns the number of entries deleted.
+    """
+    referenced = {name for names in manifest['cache'].values() for name in names}
+    entries = [
+        *BUILD_CACHE_DIR.glob('*.css'), *BUILD_CACHE_DIR.glob('*.js'),
+        *DOCUMENT_CACHE_DIR.glob('*.json'), *RELATED_CACHE_DIR.glob('*.json'),
+    ]
+    removed = 0
+    for path in entries:
+        if path.relative_to(BUILD_CACHE_DIR).as_posix() not in referenced:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def data_block(block_id, value, compress=False):
+    """Embed value as an inert data <script> element read by the viewer.
+
+    Plain blocks hold JSON. Compressed blocks hold the JSON deflate-compressed
+    (raw DEFLATE, no zlib header) and base64 encoded; the viewer inflates
+    them with DecompressionStream, or its bundled inflate() fallback.
+    """
+    if not compress:
+        return f'<script type="application/json" id="{block_id}">{json_for_script(value)}</script>'
+    raw = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    payload = base64.b64encode(compressor.compress(raw) + compressor.flush()).decode('ascii')
+    return f'<script type="application/octet-stream" data-encoding="deflate-raw" id="{block_id}">{payload}</script>'
+
+
+def escape_html(text):
+    """Escape text the way the viewer's escapeHtml() serialises a text node."""
+    return (text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            .replace('\u00a0', '&nbsp;'))
+
+
+def hash_string(text):
+    """32-bit FNV-1a hash of the UTF-16 code units of text, in base 36.
+
+    Mirrors the viewer's hashString(), which derives code block ids.
+    """
+    data = text.encode('utf-16-le')
+    h = 0x811c9dc5
+    for i in range(0, len(data), 2):
+        h ^= data[i] | (data[i + 1] << 8)
+        h = (h * 0x01000193) & 0xffffffff
+    return to_base36(h)
+
+
+# Build-time syntax highlighting of fenced code blocks: code fence language
+# -> highlighter. Each highlighter is a token regex with one named group per
+# token kind; "word" matches are classified by the highlighter's word sets.
+HIGHLIGHT_LANGUAGES = {'hemlock': 'hemlock', 'hml': 'hemlock', 'bash': 'bash', 'json': 'json'}
+
+HIGHLIGHT_RULES = {
+    'hemlock': re.compile(
+        r'(?P<comment>//[^\n]*|/\*.*?(?:\*/|$))'
+        r'|(?P<string>"(?:\\.|[^"\\\n])*"?|`(?:\\.|[^`\\])*`?|\'(?:\\.|[^\'\\\n])*\'?)'
+        r'|(?P<number>\b(?:0[xX][\da-fA-F_]+|0[bB][01_]+|\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?)\b)'
+        r'|(?P<word>[A-Za-z_]\w*)', re.S),
+    'bash': re.compile(
+        r'(?P<comment>(?<![^\s;|&(])#[^\n]*)'
+        r'|(?P<string>"(?:\\.|[^"\\])*"?|\'[^\']*\'?)'
+        r'|(?P<variable>\$(?:\{[^}\n]*\}?|\w+|[@#?$!*-]))'
+        r'|(?P<option>(?<![\w./-])--?[A-Za-z][\w-]*)'
+        r'|(?P<word>[A-Za-z_][\w.-]*)'),
+    'json': re.compile(
+        r'(?P<property>"(?:\\.|[^"\\\n])*"(?=\s*:))'
+        r'|(?P<string>"(?:\\.|[^"\\\n])*"?)'
+        r'|(?P<number>-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)'
+        r'|(?P<word>[A-Za-z_]\w*)'),
+}
+
+HEMLOCK_KEYWORDS = frozenset(
+    'let const fn if else while for in loop break continue return typeof import export from try catch '
+    'finally throw panic async await spawn join detach channel define switch case default extern self '
+    'type defer enum ref buffer Self match'.split())
+HIGHLIGHT_LITERALS = frozenset(('true', 'false', 'null'))
+HEMLOCK_TYPES = frozenset(
+    'i8 i16 i32 i64 u8 u16 u32 u64 f32 f64 bool string rune ptr array object integer number byte '
+    'void'.split())
+BASH_KEYWORDS = frozenset(
+    'if then else elif fi for while until do done case esac in function return export local '
+    'source select break continue'.split())
+
+# Bash words after which a command starts
+BASH_COMMAND_PREFIXES = frozenset(('$', 'then', 'do', 'else', 'if', 'elif', 'while', 'until', '!', 'sudo', 'time'))
+
+# Token kinds, by index in the runs sent to the viewer (see code_highlights())
+HIGHLIGHT_KINDS = ('keyword', 'string', 'number', 'comment', 'type', 'function', 'literal',
+                   'property', 'variable', 'option')
+
+_highlights = {}
+
+
+def _word_class(family, code, match):
+    """Token kind of an identifier-like word, or None to leave it plain."""
+    word = match.group()
+    if family == 'hemlock':
+        if word in HIGHLIGHT_LITERALS:
+            return 'literal'
+        if word in HEMLOCK_KEYWORDS:
+            return 'keyword'
+        if word in HEMLOCK_TYPES or word[0].isupper():
+            return 'type'
+        rest = code[match.end():match.end() + 40].lstrip(' ')
+        return 'function' if rest.startswith('(') else None
+    if family == 'json':
+        return 'literal' if word in HIGHLIGHT_LITERALS else None
+    # bash: keywords, and the command at the start of each command (after
+    # a "$ " prompt, a separator or a keyword such as "then")
+    if word in BASH_KEYWORDS:
+        return 'keyword'
+    before = code[:match.start()].rsplit('\n', 1)[-1].rstrip(' \t')
+    if not before or before[-1] in '|;&(`' or before.endswith('$('):
+        return 'function'
+    return 'function' if before.split()[-1] in BASH_COMMAND_PREFIXES else None
+
+
+def highlight_tokens(code, lang):
+    """Highlighted tokens of a fenced code block, or None.
+
+    Blocks tagged with a language in HIGHLIGHT_LANGUAGES are tokenised into
+    (start, end, kind) tuples; other blocks return None. Results are
+    memoised by content hash, since the same examples recur in the pages
+    of every language.
+    """
+    family = HIGHLIGHT_LANGUAGES.get(lang)
+    if family is None:
+        return None
+    key = content_hash(f'{family}\0{code}')
+    tokens = _highlights.get(key)
+    if tokens is None:
+        tokens = []
+        for match in HIGHLIGHT_RULES[family].finditer(code):
+            kind = match.lastgroup
+            if kind == 'word':
+                kind = _word_class(family, code, match)
+                if kind is None:
+                    continue
+            tokens.append((match.start(), match.end(), kind))
+        _highlights[key] = tokens
+    return tokens
+
+
+def highlight_code(code, lang):
+    """HTML of a code block with its tokens in <span class="hl-<kind>">.
+
+    Returns None for languages that are not highlighted. The viewer's
+    highlightCode() builds the same markup from code_highlights() runs.
+    """
+    tokens = highlight_tokens(code, lang)
+    if tokens is None:
+        return None
+    out = []
+    pos = 0
+    for start, end, kind in tokens:
+        out.append(escape_html(code[pos:start]))
+        out.append(f'<span class="hl-{kind}">{escape_html(code[start:end])}</span>')
+        pos = end
+    out.append(escape_html(code[pos:]))
+    return ''.join(out)
+
+
+def highlight_runs(code, lang):
+    """Highlighted tokens of a code block as runs for the viewer, or None.
+
+    A flat list [gap, length, kind index, ...], gap being the number of
+    characters (UTF-16 code units) since the end of the previous token;
+    it is much smaller than the HTML.
+    """
+    tokens = highlight_tokens(code, lang)
+    if not tokens:
+        return None
+    kinds = {kind: i for i, kind in enumerate(HIGHLIGHT_KINDS)}
+    runs = []
+    pos = 0
+    for start, end, kind in tokens:
+        runs += [utf16_len(code[pos:start]), utf16_len(code[start:end]), kinds[kind]]
+        pos = end
+    return runs
+
+
+def code_highlights(docs):
+    """Highlight runs of the code blocks of docs, for the viewer.
+
+    Keyed by "<fence language>:<code hash>", which the viewer's
+    parseMarkdown() computes for each block it renders. The runs and
+    hashes come from the cached document model (see highlight_runs()).
+    Keys that collide for different code are left out, so those blocks
+    stay plain.
+    """
+    highlights = {}
+    collisions = set()
+    for info in docs.values():
+        for block in info['document']['code']:
+            runs = block['highlights']
+            if runs is None:
+                continue
+            key = f"{block['lang']}:{block['hash']}"
+            if highlights.setdefault(key, runs) != runs:
+                collisions.add(key)
+    for key in collisions:
+        del highlights[key]
+    return highlights
+
+
+TABLE_SEPARATOR_RE = re.compile(r'\|?[\s\-:|]+\|[\s\-:|]+\|?')
+
+# Bump when parse_document() output changes so stale cache entries are not reused
+DOCUMENT_MODEL_VERSION = '5'
+DOCUMENT_CACHE_DIR = BUILD_CACHE_DIR / 'documents'
+
+_documents = {}
+
+
+def parse_document(md):
+    """Parse page markdown into the document model shared by the emitters.
+
+    A port of the viewer's parseMarkdown(); both must produce the same
+    markup so prerendered site pages match client-rendered ones. Returns
+    a dict with:
+        blocks: HTML of each top-level block
+        headings: level, text and anchor id of each heading
+        sections: heading-delimited sections, with the anchor id, heading,
+                  text (link targets dropped), the offset/length in UTF-16
+                  code units within md and the number of the first line.
+                  Text before the first heading forms a section with an
+                  empty id. Each also carries the token estimate of its
+                  lines and their condensed form for llms-small.txt (see
+                  condense_markdown()) with its token estimate and code.
+        code: language, text, element id, hash (see hash_string()) and
+              highlight runs (see highlight_runs()) of each fenced code
+              block
+        links: label and target of each inline link
+        text: md with trailing whitespace stripped from each line
+    """
+    blocks = []
+    headings = []
+    code_blocks = []
+    links = []
+    sections = [{'id': '', 'heading': None, 'lines': [], 'offset': 0, 'line': 0}]
+    state = {
+        'code': None, 'code_lang': '',
+        'list': '', 'in_list': False,
+        'quote': '', 'in_quote': False,
+        'rows': [], 'in_table': False, 'table_header': False,
+    }
+    used_ids = {}
+    used_code_ids = {}
+    offset = 0
+
+    def link(match):
+        label, href = match.group(1), match.group(2)
+        links.append({'label': label, 'target': href})
+        return f'<a href="{href}">{label}</a>'
+
+    def inline(text):
+        text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
+        text = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', text)
+        text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
+        return re.sub(r'\[([^\]]+)\]\(([^)]+)\)', link, text)
+
+    def unique_code_id(code_hash):
+        base = 'code-' + code_hash
+        count = used_code_ids.get(base, 0)
+        used_code_ids[base] = count + 1
+        return f'{base}-{count}' if count else base
+
+    def flush_list():
+        if state['in_list'] and state['list']:
+            blocks.append('<ul>\n' + state['list'] + '</ul>\n')
+            state['list'] = ''
+            state['in_list'] = False
+
+    def flush_quote():
+        if state['in_quote'] and state['quote']:
+            blocks.append('<blockquote>' + inline(state['quote'].strip()) + '</blockquote>\n')
+            state['quote'] = ''
+            state['in_quote'] = False
+
+    def flush_table():
+        if not (state['in_table'] and state['rows']):
+            return
+        has_header = state['table_header']
+        table = '<div class="table-wrapper" role="region" aria-label="Data table" tabindex="0"><table>\n'
+        body_started = False
+        for r, row in enumerate(state['rows']):
+            is_header = has_header and r == 0
+            tag = 'th' if is_header else 'td'
+            if is_header:
+                table += '<thead>\n'
+            elif has_header and r == 1 and not body_started:
+                table += '<tbody>\n'
+                body_started = True
+            table += '<tr>\n'
+            scope = ' scope="col"' if is_header else ''
+            for cell in row:
+                table += f'<{tag}{scope}>{inline(cell.strip())}</{tag}>\n'
+            table += '</tr>\n'
+            if is_header:
+                table += '</thead>\n'
+        if body_started:
+            table += '</tbody>\n'
+        table += '</table></div>\n'
+        blocks.append(table)
+        state['rows'] = []
+        state['in_table'] = False
+        state['table_header'] = False
+
+    for line_num, line in enumerate(md.split('\n')):
+        trimmed = line.strip()
+        sections[-1]['lines'].append(line)
+        offset += utf16_len(line) + 1
+
+        # Code blocks (including indented ones in lists)
+        if trimmed.startswith('```'):
+            if state['code'] is not None:
+                code = state['code']
+                code_hash = hash_string(code)
+                code_id = unique_code_id(code_hash)
+                code_blocks.append({'lang': state['code_lang'], 'code': code, 'id': code_id, 'hash': code_hash,
+                                    'highlights': highlight_runs(code, state['code_lang'])})
+                blocks.append(
+                    '<div class="code-block"><div class="code-header">'
+                    f'<span class="code-lang">{state["code_lang"] or "code"}</span>'
+                    '<button class="copy-btn" type="button" aria-label="Copy code">'
+                    '<svg aria-hidden="true"><use href="#icon-copy"></use></svg><span>Copy</span></button>'
+                    f'</div><pre><code id="{code_id}">'
+                    f'{highlight_code(code, state["code_lang"]) or escape_html(code)}</code></pre></div>\n')
+                state['code'] = None
+                state['code_lang'] = ''
+            else:
+                flush_list()
+                flush_quote()
+                state['code'] = ''
+                state['code_lang'] = trimmed[3:].strip()
+            continue
+        if state['code'] is not None:
+            state['code'] += line + '\n'
+            continue
+
+        # Tables
+        if '|' in trimmed and (trimmed.startswith('|') or trimmed.endswith('|')):
+            flush_list()
+            flush_quote()
+            if TABLE_SEPARATOR_RE.fullmatch(trimmed) and '-' in trimmed:
+                if len(state['rows']) == 1:
+                    state['table_header'] = True
+            else:
+                cells = trimmed.split('|')
+                if cells and cells[0].strip() == '':
+                    cells.pop(0)
+                if cells and cells[-1].strip() == '':
+                    cells.pop()
+                state['rows'].append(cells)
+                state['in_table'] = True
+            continue
+        if state['in_table']:
+            flush_table()
+
+        heading = re.match(r'(#{1,4}) ', line)
+        if heading:
+            flush_list()
+            flush_quote()
+            level = len(heading.group(1))
+            text = line[level + 1:].strip()
+            heading_id = make_heading_id(text, used_ids)
+            headings.append({'level': level, 'text': text, 'id': heading_id})
+            # The heading line starts a new section
+            sections[-1]['lines'].pop()
+            sections.append({'id': heading_id, 'heading': text, 'lines': [line],
+                             'offset': offset - utf16_len(line) - 1, 'line': line_num})
+            blocks.append(f'<h{level} class="section-anchor" id="{heading_id}">{inline(text)}</h{level}>\n')
+            continue
+
+        if trimmed == '---':
+            flush_list()
+            flush_quote()
+            blocks.append('<hr>\n')
+            continue
+
+        if line.startswith('> '):
+            flush_list()
+            state['quote'] += line[2:] + ' '
+            state['in_quote'] = True
+            continue
+        elif state['in_quote'] and trimmed == '':
+            flush_quote()
+            continue
+
+        if line.startswith('- ') or line.startswith('* '):
+            flush_quote()
+            state['list'] += '<li>' + inline(line[2:].strip()) + '</li>\n'
+            state['in_list'] = True
+            continue
+        elif state['in_list'] and trimmed != '' and not line.startswith('#'):
+            items = state['list'].rstrip()
+            if items.endswith('</li>'):
+                items = items[:-5] + ' ' + inline(trimmed) + '</li>\n'
+            state['list'] = items
+            continue
+        elif state['in_list'] and trimmed == '':
+            flush_list()
+            continue
+
+        flush_list()
+        flush_quote()
+        if trimmed != '':
+            blocks.append('<p>' + inline(line) + '</p>\n')
+
+    flush_list()
+    flush_quote()
+    flush_table()
+
+    section_list = []
+    for section in sections:
+        text = '\n'.join(section['lines'])
+        if section['heading'] is None and not text.strip():
+            continue
+        section_list.append({
+            'id': section['id'],
+            'heading': section['heading'],
+            # Drop link targets so URLs and page ids don't pollute the index
+            'text': re.sub(r'\]\([^)]*\)', ']', text),
+            'offset': section['offset'],
+            'length': utf16_len(text),
+            'line': section['line'],
+        })
+
+    document = {
+        'blocks': blocks,
+        'headings': headings,
+        'sections': section_list,
+        'code': code_blocks,
+        'links': links,
+        'text': '\n'.join(line.rstrip() for line in md.split('\n')),
+    }
+
+    # Counted here so the LLM outputs reuse the cached counts
+    lines = document['text'].split('\n')
+    for section, start, end in section_spans(document, len(lines)):
+        text = '\n'.join(lines[start:end])
+        condensed, code = condense_markdown(text, set())
+        section['tokens'] = estimate_tokens(text)
+        section['condensed'] = condensed
+        section['condensed_tokens'] = estimate_tokens(condensed)
+        section['condensed_code'] = sorted(code)
+    return document
+
+
+def load_document(md):
+    """The document model of md, parsed once per build and cached on disk.
+
+    Entries live in .build-cache/documents/ keyed by a hash of the
+    markdown and the builder, so pages shared between languages (and runs)
+    are parsed once, and again whenever the parser or highlighter changes.
     """
+    key = hashlib.sha256(f'{BUILDER_DIGEST}\0{DOCUMENT_MODEL_VERSION}\0{md}'.encode('utf-8')).hexdigest()[:24]
+    path = cache_path(f'documents/{key}.json')
+    document = _documents.get(key)
+    if document is not None:
+        return document
+    try:
+        document = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        document = parse_document(md)
+        write_artifact(path, json.dumps(document, ensure_ascii=False, separators=(',', ':')))
+    _documents[key] = document
+    return document
+
+
+def render_blocks(document, page_ids=None):
+    """HTML of a parsed page; with page_ids, links to those pages point at
+    their site URLs (as the viewer's processInlineMarkdown() does on site
+    pages)."""
+    html = ''.join(document['blocks'])
+    if page_ids is None:
+        return html
+
+    def site_link(match):
+        page_id = match.group(1)
+        if page_id in page_ids:
+            return f'<a href="../{page_id}/" data-page="{page_id}">'
+        return match.group(0)
+    return re.sub(r'<a href="#([^"]*)">', site_link, html)
 
-    # Generate navigation items
+
+def build_navigation(docs, site=False, active_id=None):
+    """Generate the sidebar navigation links.
+
+    Links are hashes in the single-file viewer, or relative page URLs on
+    site pages (where active_id marks the current page).
+    """
     nav_items = []
     current_section = None
 
@@ -1082,789 +2527,67 @@ def generate_html(docs, logo_data, lang='en'):
 
         # Simplify title for navigation (remove section prefix)
         nav_title = title.split(' -> ')[-1] if ' -> ' in title else title
-        nav_items.append(f'<a href="#{info["id"]}" class="nav-link" data-page="{info["id"]}">{nav_title}</a>')
+        if not site:
+            nav_items.append(f'<a href="#{info["id"]}" class="nav-link" data-page="{info["id"]}">{nav_title}</a>')
+        elif info['id'] == active_id:
+            nav_items.append(f'<a href="../{info["id"]}/" class="nav-link active" data-page="{info["id"]}" '
+                             f'aria-current="page">{nav_title}</a>')
+        else:
+            nav_items.append(f'<a href="../{info["id"]}/" class="nav-link" data-page="{info["id"]}">{nav_title}</a>')
 
     if current_section:
         nav_items.append('</div>')
 
-    navigation_html = '\n'.join(nav_items)
+    return '\n'.join(nav_items)
 
-    # Generate page content (embedded as JSON)
-    pages_json = json.dumps({
-        title: {'id': info['id'], 'content': info['content']}
-        for title, info in docs.items()
-    }, ensure_ascii=False)
-
-    # Language-specific titles
-    titles = {
-        'en': 'Hemlock Language Manual',
-        'zh': 'Hemlock 语言手册',
-        'de': 'Hemlock-Sprachhandbuch',
-        'es': 'Manual del Lenguaje Hemlock',
-        'fr': 'Manuel du Langage Hemlock',
-        'it': 'Manuale del Linguaggio Hemlock',
-        'ja': 'Hemlock言語マニュアル',
-        'pt': 'Manual da Linguagem Hemlock',
-        'ru': 'Справочник языка Hemlock',
-    }
-    page_title = titles.get(lang, titles['en'])
 
-    # Generate language switcher options
-    lang_options = []
-    for code, name in SUPPORTED_LANGUAGES.items():
-        filename = 'docs.html' if code == 'en' else f'docs-{code}.html'
-        selected = 'selected' if code == lang else ''
-        lang_options.append(f'<option value="{filename}" {selected}>{name}</option>')
-    lang_options_html = '\n'.join(lang_options)
+# Language-specific manual titles
+MANUAL_TITLES = {
+    'en': 'Hemlock Language Manual',
+    'zh': 'Hemlock 语言手册',
+    'de': 'Hemlock-Sprachhandbuch',
+    'es': 'Manual del Lenguaje Hemlock',
+    'fr': 'Manuel du Langage Hemlock',
+    'it': 'Manuale del Linguaggio Hemlock',
+    'ja': 'Hemlock言語マニュアル',
+    'pt': 'Manual da Linguagem Hemlock',
+    'ru': 'Справочник языка Hemlock',
+}
 
-    html = f'''<!DOCTYPE html>
+
+def render_shell(lang, title, heading, head_html, logo_src, lang_options_html,
+                 navigation_html, content_html, data_html, scripts_html, version_options_html=''):
+    """Fill in the viewer page shared by single-file and site builds."""
+    version_html = ''
+    if version_options_html:
+        version_html = f'''        <select class="lang-switcher" id="versionSwitcher" onchange="switchLanguage(this.value)" aria-label="Select version">
+            {version_options_html}
+        </select>
+'''
+    return f'''<!DOCTYPE html>
 <html lang="{lang}">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{page_title}</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        :root {{
-            --sage: #9CAF88;
-            --pine: #2F4F4F;
-            --dark-pine: #1a2f2f;
-            --light-sage: #E8F4E1;
-            --cream: #FAF9F6;
-            --text: #2C3E2C;
-            --text-light: #5A6F5A;
-            --border: #D4E4CB;
-            --code-bg: #F5F9F3;
-            --accent: #6B8E6B;
-        }}
-
-        [data-theme="dark"] {{
-            --sage: #6B8E6B;
-            --pine: #9CAF88;
-            --dark-pine: #0d1a1a;
-            --light-sage: #1a2f2f;
-            --cream: #0f1a1a;
-            --text: #e0e8e0;
-            --text-light: #a8b8a8;
-            --border: #2a4a4a;
-            --code-bg: #162626;
-            --accent: #9CAF88;
-        }}
-
-        @media (prefers-color-scheme: dark) {{
-            :root:not([data-theme="light"]) {{
-                --sage: #6B8E6B;
-                --pine: #9CAF88;
-                --dark-pine: #0d1a1a;
-                --light-sage: #1a2f2f;
-                --cream: #0f1a1a;
-                --text: #e0e8e0;
-                --text-light: #a8b8a8;
-                --border: #2a4a4a;
-                --code-bg: #162626;
-                --accent: #9CAF88;
-            }}
-        }}
-
-        /* Skip to content link */
-        .skip-to-content {{
-            position: absolute;
-            top: -40px;
-            left: 0;
-            background: var(--pine);
-            color: white;
-            padding: 0.5rem 1rem;
-            z-index: 10000;
-            font-size: 0.9rem;
-            transition: top 0.2s;
-        }}
-
-        .skip-to-content:focus {{
-            top: 0;
-        }}
-
-        /* Focus visible styles */
-        *:focus-visible {{
-            outline: 2px solid var(--sage);
-            outline-offset: 2px;
-        }}
-
-        .header *:focus-visible {{
-            outline-color: rgba(255, 255, 255, 0.8);
-        }}
-
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', 'Helvetica', 'Arial', sans-serif;
-            line-height: 1.7;
-            color: var(--text);
-            background: var(--cream);
-        }}
-
-        /* Header */
-        .header {{
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 70px;
-            background: #2F4F4F;
-            color: white;
-            display: flex;
-            align-items: center;
-            justify-content: flex-end;
-            padding: 0 1rem;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            z-index: 1000;
-        }}
-
-        .header-logo {{
-            height: 45px;
-            margin-right: 1rem;
-        }}
-
-        .header h1 {{
-            font-size: 1.5rem;
-            font-weight: 600;
-            letter-spacing: 0.5px;
-            margin-right: auto;
-        }}
-
-        @media (max-width: 1023px) {{
-            .header {{
-                justify-content: flex-start;
-            }}
-            .header h1 {{
-                display: none;
-            }}
-        }}
-
-        /* Layout */
-        .container {{
-            display: flex;
-            margin-top: 70px;
-            min-height: calc(100vh - 70px);
-        }}
-
-        /* Sidebar */
-        .sidebar {{
-            position: fixed;
-            left: 0;
-            top: 70px;
-            width: 280px;
-            height: calc(100vh - 70px);
-            background: var(--light-sage);
-            border-right: 2px solid var(--border);
-            overflow-y: auto;
-            padding: 2rem 0;
-            transform: translateX(-100%);
-            transition: transform 0.3s ease;
-            z-index: 900;
-        }}
-
-        .sidebar.open {{
-            transform: translateX(0);
-        }}
-
-        @media (min-width: 1024px) {{
-            .sidebar {{
-                transform: translateX(0);
-            }}
-        }}
-
-        .nav-section {{
-            margin-bottom: 1.5rem;
-        }}
-
-        .nav-section-title {{
-            font-size: 0.75rem;
-            font-weight: 700;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            color: var(--pine);
-            padding: 0 1.5rem;
-            margin-bottom: 0.5rem;
-        }}
-
-        .nav-link {{
-            display: block;
-            padding: 0.5rem 1.5rem;
-            color: var(--text);
-            text-decoration: none;
-            font-size: 0.9rem;
-            transition: all 0.2s;
-            border-left: 3px solid transparent;
-            cursor: pointer;
-        }}
-
-        .nav-link:hover {{
-            background: rgba(47, 79, 79, 0.05);
-            border-left-color: var(--sage);
-        }}
-
-        .nav-link.active {{
-            background: rgba(47, 79, 79, 0.1);
-            border-left-color: var(--pine);
-            font-weight: 600;
-            color: var(--pine);
-        }}
-
-        /* Mobile Menu Toggle */
-        .menu-toggle {{
-            display: none;
-            background: transparent;
-            border: none;
-            color: white;
-            font-size: 1.5rem;
-            cursor: pointer;
-            padding: 0.5rem;
-            margin-right: 0.5rem;
-        }}
-
-        @media (max-width: 1023px) {{
-            .menu-toggle {{
-                display: flex;
-                align-items: center;
-                justify-content: center;
-            }}
-        }}
-
-        /* Main Content */
-        .main-content {{
-            flex: 1;
-            margin-left: 0;
-            padding: 3rem 2rem;
-            max-width: 900px;
-        }}
-
-        @media (min-width: 1024px) {{
-            .main-content {{
-                margin-left: 280px;
-            }}
-        }}
-
-        /* Typography */
-        .content h1 {{
-            font-size: 2.5rem;
-            color: var(--pine);
-            margin: 2rem 0 1rem;
-            padding-bottom: 0.5rem;
-            border-bottom: 3px solid var(--sage);
-        }}
-
-        .content h2 {{
-            font-size: 2rem;
-            color: var(--pine);
-            margin: 3rem 0 1rem;
-            padding-top: 1rem;
-        }}
-
-        .content h3 {{
-            font-size: 1.5rem;
-            color: var(--accent);
-            margin: 2rem 0 1rem;
-        }}
-
-        .content h4 {{
-            font-size: 1.2rem;
-            color: var(--accent);
-            margin: 1.5rem 0 0.8rem;
-        }}
-
-        .content p {{
-            margin: 1rem 0;
-            color: var(--text);
-        }}
-
-        .content ul, .content ol {{
-            margin: 1rem 0 1rem 2rem;
-        }}
-
-        .content li {{
-            margin: 0.5rem 0;
-        }}
-
-        .content blockquote {{
-            border-left: 4px solid var(--sage);
-            background: var(--light-sage);
-            padding: 1rem 1.5rem;
-            margin: 1.5rem 0;
-            font-style: italic;
-            color: var(--text-light);
-        }}
-
-        .content hr {{
-            border: none;
-            border-top: 2px solid var(--border);
-            margin: 2rem 0;
-        }}
-
-        /* Code Blocks */
-        .content code {{
-            background: var(--code-bg);
-            padding: 0.2rem 0.4rem;
-            border-radius: 3px;
-            font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
-            font-size: 0.9em;
-            color: var(--pine);
-        }}
-
-        .code-block {{
-            margin: 1.5rem 0;
-            border-radius: 8px;
-            overflow: hidden;
-            border: 1px solid var(--border);
-            background: var(--code-bg);
-        }}
-
-        .code-header {{
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            padding: 0.5rem 1rem;
-            background: var(--pine);
-            color: var(--light-sage);
-            font-size: 0.8rem;
-        }}
-
-        .code-lang {{
-            font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
-            font-weight: 600;
-            text-transform: lowercase;
-        }}
-
-        .copy-btn {{
-            background: transparent;
-            border: 1px solid var(--sage);
-            color: var(--light-sage);
-            padding: 0.3rem 0.7rem;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 0.75rem;
-            transition: all 0.2s;
-            display: flex;
-            align-items: center;
-            gap: 0.3rem;
-        }}
-
-        .copy-btn:hover {{
-            background: var(--sage);
-            color: var(--pine);
-        }}
-
-        .copy-btn.copied {{
-            background: var(--sage);
-            color: var(--pine);
-            border-color: var(--sage);
-        }}
-
-        .copy-btn svg {{
-            width: 14px;
-            height: 14px;
-        }}
-
-        .content pre {{
-            background: var(--code-bg);
-            margin: 0;
-            padding: 1.2rem;
-            overflow-x: auto;
-        }}
-
-        .content pre code {{
-            background: none;
-            padding: 0;
-            border-radius: 0;
-            font-size: 0.85rem;
-            line-height: 1.6;
-        }}
-
-        /* Standalone pre without code-block wrapper (legacy) */
-        .content > pre {{
-            border: 1px solid var(--border);
-            border-left: 4px solid var(--pine);
-            border-radius: 4px;
-            margin: 1.5rem 0;
-        }}
-
-        /* Tables */
-        .content table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin: 1.5rem 0;
-        }}
-
-        .content th,
-        .content td {{
-            padding: 0.75rem;
-            text-align: left;
-            border-bottom: 1px solid var(--border);
-        }}
-
-        .content th {{
-            background: var(--light-sage);
-            color: var(--pine);
-            font-weight: 600;
-        }}
-
-        /* Links */
-        .content a {{
-            color: var(--accent);
-            text-decoration: none;
-            border-bottom: 1px solid transparent;
-            transition: border-color 0.2s;
-        }}
-
-        .content a:hover {{
-            border-bottom-color: var(--accent);
-        }}
-
-        /* Scrollbar */
-        ::-webkit-scrollbar {{
-            width: 10px;
-        }}
-
-        ::-webkit-scrollbar-track {{
-            background: var(--cream);
-        }}
-
-        ::-webkit-scrollbar-thumb {{
-            background: var(--sage);
-            border-radius: 5px;
-        }}
-
-        ::-webkit-scrollbar-thumb:hover {{
-            background: var(--accent);
-        }}
-
-        /* Section anchors */
-        .section-anchor {{
-            scroll-margin-top: 90px;
-        }}
-
-        /* Mobile adjustments */
-        @media (max-width: 1023px) {{
-            .main-content {{
-                padding: 2rem 1rem;
-            }}
-
-            .content h1 {{
-                font-size: 2rem;
-            }}
-
-            .content h2 {{
-                font-size: 1.6rem;
-            }}
-
-            .content h3 {{
-                font-size: 1.3rem;
-            }}
-        }}
-
-        /* Page switching */
-        .page {{
-            display: none;
-        }}
-
-        .page.active {{
-            display: block;
-        }}
-
-        /* Search */
-        .search-container {{
-            position: relative;
-            margin-right: 1rem;
-        }}
-
-        .search-input {{
-            width: 200px;
-            padding: 0.5rem 1rem;
-            padding-left: 2.2rem;
-            border: none;
-            border-radius: 20px;
-            background: rgba(255, 255, 255, 0.15);
-            color: white;
-            font-size: 0.9rem;
-            transition: all 0.3s;
-        }}
-
-        .search-input::placeholder {{
-            color: rgba(255, 255, 255, 0.6);
-        }}
-
-        .search-input:focus {{
-            outline: none;
-            background: rgba(255, 255, 255, 0.25);
-            width: 280px;
-        }}
-
-        .search-icon {{
-            position: absolute;
-            left: 0.8rem;
-            top: 50%;
-            transform: translateY(-50%);
-            color: rgba(255, 255, 255, 0.6);
-            pointer-events: none;
-        }}
-
-        .search-results {{
-            position: absolute;
-            top: calc(100% + 0.5rem);
-            left: 0;
-            right: 0;
-            min-width: 320px;
-            max-height: 400px;
-            overflow-y: auto;
-            background: white;
-            border-radius: 8px;
-            box-shadow: 0 4px 20px rgba(0, 0, 0, 0.2);
-            display: none;
-            z-index: 1001;
-        }}
-
-        .search-results.active {{
-            display: block;
-        }}
-
-        .search-result {{
-            padding: 0.75rem 1rem;
-            cursor: pointer;
-            border-bottom: 1px solid var(--border);
-            transition: background 0.2s;
-        }}
-
-        .search-result:last-child {{
-            border-bottom: none;
-        }}
-
-        .search-result:hover,
-        .search-result.selected {{
-            background: var(--light-sage);
-        }}
-
-        .search-result-title {{
-            font-weight: 600;
-            color: var(--pine);
-            font-size: 0.95rem;
-            margin-bottom: 0.25rem;
-        }}
-
-        .search-result-section {{
-            font-size: 0.75rem;
-            color: var(--text-light);
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-
-        .search-result-preview {{
-            font-size: 0.85rem;
-            color: var(--text-light);
-            margin-top: 0.25rem;
-            line-height: 1.4;
-        }}
-
-        .search-result-preview mark {{
-            background: var(--sage);
-            color: var(--pine);
-            padding: 0 2px;
-            border-radius: 2px;
-        }}
-
-        .search-no-results {{
-            padding: 1rem;
-            text-align: center;
-            color: var(--text-light);
-            font-size: 0.9rem;
-        }}
-
-        .search-shortcut {{
-            display: none;
-            margin-left: 0.5rem;
-            padding: 0.15rem 0.4rem;
-            background: rgba(255, 255, 255, 0.2);
-            border-radius: 4px;
-            font-size: 0.7rem;
-            color: rgba(255, 255, 255, 0.8);
-        }}
-
-        @media (min-width: 1024px) {{
-            .search-shortcut {{
-                display: inline-block;
-            }}
-        }}
-
-        @media (max-width: 1023px) {{
-            .search-container {{
-                position: fixed;
-                top: 70px;
-                left: 0;
-                right: 0;
-                margin: 0;
-                padding: 0.5rem;
-                background: #1a2f2f;
-                display: none;
-                z-index: 999;
-            }}
-
-            .search-container.active {{
-                display: block;
-            }}
-
-            .search-input {{
-                width: 100%;
-            }}
-
-            .search-input:focus {{
-                width: 100%;
-            }}
-
-            .search-results {{
-                position: fixed;
-                top: 120px;
-                left: 0.5rem;
-                right: 0.5rem;
-                min-width: auto;
-                max-height: calc(100vh - 140px);
-            }}
-
-            .search-toggle {{
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                background: transparent;
-                border: none;
-                color: white;
-                font-size: 1.2rem;
-                cursor: pointer;
-                padding: 0.5rem;
-                margin-left: auto;
-            }}
-        }}
-
-        @media (min-width: 1024px) {{
-            .search-toggle {{
-                display: none;
-            }}
-        }}
-
-        /* Theme Toggle */
-        .theme-toggle {{
-            background: transparent;
-            border: 1px solid rgba(255, 255, 255, 0.3);
-            color: white;
-            width: 32px;
-            height: 32px;
-            border-radius: 8px;
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            transition: all 0.2s;
-            margin-left: 4px;
-        }}
-
-        .theme-toggle:hover {{
-            background: rgba(255, 255, 255, 0.1);
-            border-color: rgba(255, 255, 255, 0.5);
-        }}
-
-        .theme-toggle svg {{
-            width: 20px;
-            height: 20px;
-        }}
-
-        .theme-toggle .sun-icon {{
-            display: none;
-        }}
-
-        .theme-toggle .moon-icon {{
-            display: block;
-        }}
-
-        [data-theme="dark"] .theme-toggle .sun-icon {{
-            display: block;
-        }}
-
-        [data-theme="dark"] .theme-toggle .moon-icon {{
-            display: none;
-        }}
-
-        @media (prefers-color-scheme: dark) {{
-            :root:not([data-theme="light"]) .theme-toggle .sun-icon {{
-                display: block;
-            }}
-            :root:not([data-theme="light"]) .theme-toggle .moon-icon {{
-                display: none;
-            }}
-        }}
-
-        /* Language Switcher */
-        .lang-switcher {{
-            background: transparent;
-            border: 1px solid rgba(255, 255, 255, 0.3);
-            color: white;
-            padding: 0.4rem 0.4rem;
-            border-radius: 8px;
-            font-size: 0.85rem;
-            cursor: pointer;
-            outline: none;
-        }}
-
-        .lang-switcher:hover {{
-            background: rgba(255, 255, 255, 0.1);
-            border-color: rgba(255, 255, 255, 0.5);
-        }}
-
-        .lang-switcher:focus {{
-            border-color: rgba(255, 255, 255, 0.5);
-        }}
-
-        .lang-switcher option {{
-            background: var(--pine);
-            color: white;
-        }}
-
-        [data-theme="dark"] .lang-switcher option {{
-            background: var(--bg-primary);
-            color: var(--text-primary);
-        }}
-        /* Screen reader only utility */
-        .sr-only {{
-            position: absolute;
-            width: 1px;
-            height: 1px;
-            padding: 0;
-            margin: -1px;
-            overflow: hidden;
-            clip: rect(0, 0, 0, 0);
-            white-space: nowrap;
-            border-width: 0;
-        }}
-
-        /* Responsive table wrapper */
-        .table-wrapper {{
-            overflow-x: auto;
-            margin: 1.5rem 0;
-            -webkit-overflow-scrolling: touch;
-        }}
-
-        .table-wrapper table {{
-            margin: 0;
-        }}
-    </style>
+    <title>{title}</title>
+{head_html}
 </head>
 <body>
+    <!-- Shared icons -->
+    <svg xmlns="http://www.w3.org/2000/svg" style="display: none" aria-hidden="true">
+        <symbol id="icon-copy" viewBox="0 0 24 24" fill="none" stroke="currentColor">
+            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M8 16H6a2 2 0 01-2-2V6a2 2 0 012-2h8a2 2 0 012 2v2m-6 12h8a2 2 0 002-2v-8a2 2 0 00-2-2h-8a2 2 0 00-2 2v8a2 2 0 002 2z" />
+        </symbol>
+    </svg>
+
     <!-- Skip to content link for keyboard users -->
     <a href="#content" class="skip-to-content">Skip to main content</a>
 
     <!-- Header -->
     <header class="header" role="banner">
         <button class="menu-toggle" id="menuToggle" aria-label="Toggle navigation menu" aria-expanded="false">&#9776;</button>
-        <img src="{logo_data}" alt="Hemlock Logo" class="header-logo">
-        <h1>{page_title}</h1>
+        <img src="{logo_src}" alt="Hemlock Logo" class="header-logo">
+        <h1>{heading}</h1>
         <!-- Search -->
         <div class="search-container" id="searchContainer" role="search" aria-label="Search documentation">
             <svg class="search-icon" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" aria-hidden="true">
@@ -1882,7 +2605,7 @@ def generate_html(docs, logo_data, lang='en'):
                 <path d="M21 21l-4.35-4.35"></path>
             </svg>
         </button>
-        <select class="lang-switcher" id="langSwitcher" onchange="switchLanguage(this.value)" aria-label="Select language">
+{version_html}        <select class="lang-switcher" id="langSwitcher" onchange="switchLanguage(this.value)" aria-label="Select language">
             {lang_options_html}
         </select>
         <button class="theme-toggle" id="themeToggle" title="Toggle dark mode" aria-label="Toggle dark mode">
@@ -1912,728 +2635,219 @@ def generate_html(docs, logo_data, lang='en'):
 
         <!-- Main Content -->
         <main class="main-content" id="main-content">
-            <div class="content" id="content" role="article" aria-label="Documentation content"></div>
+            <div class="content" id="content" role="article" aria-label="Documentation content">{content_html}</div>
+            <nav class="see-also" id="seeAlso" aria-label="See also" hidden></nav>
         </main>
     </div>
 
-    <script>
-        // Embedded documentation pages
-        const PAGES = {pages_json};
-
-        // Mobile menu toggle
-        const menuToggle = document.getElementById('menuToggle');
-        const sidebar = document.getElementById('sidebar');
-
-        menuToggle.addEventListener('click', () => {{
-            sidebar.classList.toggle('open');
-            const isOpen = sidebar.classList.contains('open');
-            menuToggle.textContent = isOpen ? '\\u00d7' : '\\u2630';
-            menuToggle.setAttribute('aria-expanded', isOpen);
-        }});
-
-        // Close sidebar when clicking outside on mobile
-        document.addEventListener('click', (e) => {{
-            if (window.innerWidth < 1024) {{
-                if (!sidebar.contains(e.target) && !menuToggle.contains(e.target)) {{
-                    sidebar.classList.remove('open');
-                    menuToggle.textContent = '\\u2630';
-                    menuToggle.setAttribute('aria-expanded', 'false');
-                }}
-            }}
-        }});
-
-        // Theme toggle functionality
-        const themeToggle = document.getElementById('themeToggle');
-        const root = document.documentElement;
-
-        // Get saved theme or detect system preference
-        function getPreferredTheme() {{
-            const savedTheme = localStorage.getItem('theme');
-            if (savedTheme) {{
-                return savedTheme;
-            }}
-            return window.matchMedia('(prefers-color-scheme: dark)').matches ? 'dark' : 'light';
-        }}
-
-        // Apply theme
-        function setTheme(theme) {{
-            root.setAttribute('data-theme', theme);
-            localStorage.setItem('theme', theme);
-        }}
-
-        // Initialize theme
-        const initialTheme = getPreferredTheme();
-        if (localStorage.getItem('theme')) {{
-            setTheme(initialTheme);
-        }}
-
-        // Toggle theme on button click
-        themeToggle.addEventListener('click', () => {{
-            const currentTheme = root.getAttribute('data-theme');
-            const prefersDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
-
-            // Determine current effective theme
-            let effectiveTheme;
-            if (currentTheme) {{
-                effectiveTheme = currentTheme;
-            }} else {{
-                effectiveTheme = prefersDark ? 'dark' : 'light';
-            }}
-
-            // Toggle to opposite theme
-            const newTheme = effectiveTheme === 'dark' ? 'light' : 'dark';
-            setTheme(newTheme);
-        }});
-
-        // Listen for system theme changes
-        window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', (e) => {{
-            if (!localStorage.getItem('theme')) {{
-                // Only auto-switch if user hasn't manually set a preference
-                root.removeAttribute('data-theme');
-            }}
-        }});
-
-        // Markdown parser
-        function parseMarkdown(md) {{
-            let lines = md.split('\\n');
-            let html = '';
-            let inCodeBlock = false;
-            let codeBlockContent = '';
-            let codeBlockLang = '';
-            let inList = false;
-            let listContent = '';
-            let inBlockquote = false;
-            let blockquoteContent = '';
-            let inTable = false;
-            let tableRows = [];
-            let tableHasHeader = false;
-
-            function processInlineMarkdown(text) {{
-                text = text.replace(/\\*\\*(.+?)\\*\\*/g, '<strong>$1</strong>');
-                text = text.replace(/\\*([^*]+)\\*/g, '<em>$1</em>');
-                text = text.replace(/`([^`]+)`/g, '<code>$1</code>');
-                text = text.replace(/\\[([^\\]]+)\\]\\(([^)]+)\\)/g, '<a href="$2">$1</a>');
-                return text;
-            }}
-
-            function makeId(text) {{
-                return text.toLowerCase()
-                    .replace(/[^\\w\\s-]/g, '')
-                    .replace(/\\s+/g, '-')
-                    .replace(/^-+|-+$/g, '');
-            }}
-
-            function flushList() {{
-                if (inList && listContent) {{
-                    html += '<ul>\\n' + listContent + '</ul>\\n';
-                    listContent = '';
-                    inList = false;
-                }}
-            }}
-
-            function flushBlockquote() {{
-                if (inBlockquote && blockquoteContent) {{
-                    html += '<blockquote>' + processInlineMarkdown(blockquoteContent.trim()) + '</blockquote>\\n';
-                    blockquoteContent = '';
-                    inBlockquote = false;
-                }}
-            }}
-
-            function flushTable() {{
-                if (inTable && tableRows.length > 0) {{
-                    html += '<div class="table-wrapper" role="region" aria-label="Data table" tabindex="0"><table>\\n';
-                    let bodyStarted = false;
-                    for (let r = 0; r < tableRows.length; r++) {{
-                        const row = tableRows[r];
-                        const isHeader = tableHasHeader && r === 0;
-                        const tag = isHeader ? 'th' : 'td';
-                        if (isHeader) {{
-                            html += '<thead>\\n';
-                        }} else if (tableHasHeader && r === 1 && !bodyStarted) {{
-                            html += '<tbody>\\n';
-                            bodyStarted = true;
-                        }}
-                        html += '<tr>\\n';
-                        for (const cell of row) {{
-                            const scope = isHeader ? ' scope="col"' : '';
-                            html += '<' + tag + scope + '>' + processInlineMarkdown(cell.trim()) + '</' + tag + '>\\n';
-                        }}
-                        html += '</tr>\\n';
-                        if (isHeader) {{
-                            html += '</thead>\\n';
-                        }}
-                    }}
-                    if (bodyStarted) {{
-                        html += '</tbody>\\n';
-                    }}
-                    html += '</table></div>\\n';
-                    tableRows = [];
-                    inTable = false;
-                    tableHasHeader = false;
-                }}
-            }}
-
-            function isTableSeparator(line) {{
-                return /^\\|?[\\s-:|]+\\|[\\s-:|]+\\|?$/.test(line) && line.includes('-');
-            }}
-
-            function parseTableRow(line) {{
-                let cells = line.split('|');
-                // Remove empty first/last cells from leading/trailing |
-                if (cells.length > 0 && cells[0].trim() === '') cells.shift();
-                if (cells.length > 0 && cells[cells.length - 1].trim() === '') cells.pop();
-                return cells;
-            }}
-
-            for (let i = 0; i < lines.length; i++) {{
-                let line = lines[i];
-                const trimmedLine = line.trim();
-
-                // Handle code blocks (including indented ones in lists)
-                if (trimmedLine.startsWith('```')) {{
-                    if (inCodeBlock) {{
-                        const codeId = 'code-' + Math.random().toString(36).substr(2, 9);
-                        const langDisplay = codeBlockLang || 'code';
-                        const copyIcon = '<svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke="currentColor" aria-hidden="true"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M8 16H6a2 2 0 01-2-2V6a2 2 0 012-2h8a2 2 0 012 2v2m-6 12h8a2 2 0 002-2v-8a2 2 0 00-2-2h-8a2 2 0 00-2 2v8a2 2 0 002 2z" /></svg>';
-                        html += `<div class="code-block">
-                            <div class="code-header">
-                                <span class="code-lang">${{langDisplay}}</span>
-                                <button class="copy-btn" onclick="copyCode('${{codeId}}')" aria-label="Copy code">${{copyIcon}}<span>Copy</span></button>
-                            </div>
-                            <pre><code id="${{codeId}}">` + escapeHtml(codeBlockContent) + '</code></pre></div>\\n';
-                        codeBlockContent = '';
-                        codeBlockLang = '';
-                        inCodeBlock = false;
-                    }} else {{
-                        flushList();
-                        flushBlockquote();
-                        inCodeBlock = true;
-                        codeBlockLang = trimmedLine.substring(3).trim();
-                    }}
-                    continue;
-                }}
-
-                if (inCodeBlock) {{
-                    codeBlockContent += line + '\\n';
-                    continue;
-                }}
-
-                // Table handling
-                if (trimmedLine.includes('|')) {{
-                    if (trimmedLine.startsWith('|') || trimmedLine.endsWith('|')) {{
-                        flushList();
-                        flushBlockquote();
-                        if (isTableSeparator(trimmedLine)) {{
-                            // This is the separator row (|---|---|), mark header
-                            if (tableRows.length === 1) {{
-                                tableHasHeader = true;
-                            }}
-                        }} else {{
-                            // Regular table row
-                            tableRows.push(parseTableRow(trimmedLine));
-                            inTable = true;
-                        }}
-                        continue;
-                    }}
-                }}
-                // Flush table if we hit a non-table line
-                if (inTable) {{
-                    flushTable();
-                }}
-
-                if (line.startsWith('# ')) {{
-                    flushList();
-                    flushBlockquote();
-                    const text = line.substring(2).trim();
-                    const id = makeId(text);
-                    html += `<h1 class="section-anchor" id="${{id}}">${{processInlineMarkdown(text)}}</h1>\\n`;
-                    continue;
-                }}
-                if (line.startsWith('## ')) {{
-                    flushList();
-                    flushBlockquote();
-                    const text = line.substring(3).trim();
-                    const id = makeId(text);
-                    html += `<h2 class="section-anchor" id="${{id}}">${{processInlineMarkdown(text)}}</h2>\\n`;
-                    continue;
-                }}
-                if (line.startsWith('### ')) {{
-                    flushList();
-                    flushBlockquote();
-                    const text = line.substring(4).trim();
-                    const id = makeId(text);
-                    html += `<h3 class="section-anchor" id="${{id}}">${{processInlineMarkdown(text)}}</h3>\\n`;
-                    continue;
-                }}
-                if (line.startsWith('#### ')) {{
-                    flushList();
-                    flushBlockquote();
-                    const text = line.substring(5).trim();
-                    const id = makeId(text);
-                    html += `<h4 class="section-anchor" id="${{id}}">${{processInlineMarkdown(text)}}</h4>\\n`;
-                    continue;
-                }}
-
-                if (line.trim() === '---') {{
-                    flushList();
-                    flushBlockquote();
-                    html += '<hr>\\n';
-                    continue;
-                }}
-
-                if (line.startsWith('> ')) {{
-                    flushList();
-                    blockquoteContent += line.substring(2) + ' ';
-                    inBlockquote = true;
-                    continue;
-                }} else if (inBlockquote && line.trim() === '') {{
-                    flushBlockquote();
-                    continue;
-                }}
-
-                if (line.startsWith('- ') || line.startsWith('* ')) {{
-                    flushBlockquote();
-                    const text = line.substring(2).trim();
-                    listContent += '<li>' + processInlineMarkdown(text) + '</li>\\n';
-                    inList = true;
-                    continue;
-                }} else if (inList && line.trim() !== '' && !line.startsWith('#')) {{
-                    listContent = listContent.trimEnd();
-                    if (listContent.endsWith('</li>')) {{
-                        listContent = listContent.substring(0, listContent.length - 5);
-                        listContent += ' ' + processInlineMarkdown(line.trim()) + '</li>\\n';
-                    }}
-                    continue;
-                }} else if (inList && line.trim() === '') {{
-                    flushList();
-                    continue;
-                }}
-
-                if (line.trim() === '') {{
-                    flushList();
-                    flushBlockquote();
-                    continue;
-                }}
-
-                flushList();
-                flushBlockquote();
-                if (line.trim() !== '') {{
-                    html += '<p>' + processInlineMarkdown(line) + '</p>\\n';
-                }}
-            }}
-
-            flushList();
-            flushBlockquote();
-            flushTable();
-
-            return html;
-        }}
-
-        function escapeHtml(text) {{
-            const div = document.createElement('div');
-            div.textContent = text;
-            return div.innerHTML;
-        }}
-
-        // Copy code to clipboard
-        function copyCode(codeId) {{
-            const codeElement = document.getElementById(codeId);
-            if (!codeElement) return;
-
-            const text = codeElement.textContent;
-            navigator.clipboard.writeText(text).then(() => {{
-                // Find the button that triggered this
-                const btn = codeElement.closest('.code-block').querySelector('.copy-btn');
-                if (btn) {{
-                    const originalText = btn.querySelector('span').textContent;
-                    btn.classList.add('copied');
-                    btn.querySelector('span').textContent = 'Copied!';
-
-                    setTimeout(() => {{
-                        btn.classList.remove('copied');
-                        btn.querySelector('span').textContent = originalText;
-                    }}, 2000);
-                }}
-            }}).catch(err => {{
-                console.error('Failed to copy:', err);
-            }});
-        }}
-
-        // Load a page
-        function loadPage(pageId) {{
-            const pageData = Object.values(PAGES).find(p => p.id === pageId);
-            if (!pageData) {{
-                console.error('Page not found:', pageId);
-                return;
-            }}
-
-            const content = parseMarkdown(pageData.content);
-            const contentEl = document.getElementById('content');
-            contentEl.innerHTML = content;
-
-            // Update active nav link and aria-current
-            document.querySelectorAll('.nav-link').forEach(link => {{
-                link.classList.remove('active');
-                link.removeAttribute('aria-current');
-                if (link.dataset.page === pageId) {{
-                    link.classList.add('active');
-                    link.setAttribute('aria-current', 'page');
-                }}
-            }});
-
-            // Scroll to top
-            window.scrollTo(0, 0);
-
-            // Move focus to content for screen readers
-            contentEl.setAttribute('tabindex', '-1');
-            contentEl.focus({{ preventScroll: true }});
-
-            // Update URL hash
-            window.location.hash = pageId;
-        }}
-
-        // Setup navigation
-        document.querySelectorAll('.nav-link').forEach(link => {{
-            link.addEventListener('click', (e) => {{
-                e.preventDefault();
-                const pageId = link.dataset.page;
-                loadPage(pageId);
-
-                // Close mobile menu
-                if (window.innerWidth < 1024) {{
-                    sidebar.classList.remove('open');
-                    menuToggle.textContent = '\\u2630';
-                }}
-            }});
-        }});
-
-        // Handle browser back/forward
-        window.addEventListener('hashchange', () => {{
-            const hash = window.location.hash.substring(1);
-            if (hash) {{
-                loadPage(hash);
-            }}
-        }});
-
-        // Search functionality
-        const searchInput = document.getElementById('searchInput');
-        const searchResults = document.getElementById('searchResults');
-        const searchContainer = document.getElementById('searchContainer');
-        const searchToggle = document.getElementById('searchToggle');
-        let selectedIndex = -1;
-        let currentResults = [];
-
-        // Build search index from PAGES
-        function buildSearchIndex() {{
-            const index = [];
-            for (const [title, page] of Object.entries(PAGES)) {{
-                // Extract section from page ID
-                const parts = page.id.split('-');
-                let section = '';
-                if (parts.length > 1) {{
-                    section = parts.slice(0, -1).join(' ');
-                }}
-
-                // Extract headings from content
-                const headings = [];
-                const headingRegex = /^#+\\s+(.+)$/gm;
-                let match;
-                while ((match = headingRegex.exec(page.content)) !== null) {{
-                    headings.push(match[1]);
-                }}
-
-                // Get preview text (first 200 chars, stripped of markdown)
-                let preview = page.content
-                    .replace(/^#+\\s+.+$/gm, '')  // Remove headings
-                    .replace(/```[\\s\\S]*?```/g, '')  // Remove code blocks
-                    .replace(/`[^`]+`/g, '')  // Remove inline code
-                    .replace(/\\[([^\\]]+)\\]\\([^)]+\\)/g, '$1')  // Convert links to text
-                    .replace(/\\*\\*([^*]+)\\*\\*/g, '$1')  // Remove bold
-                    .replace(/\\*([^*]+)\\*/g, '$1')  // Remove italic
-                    .replace(/\\n+/g, ' ')  // Normalize whitespace
-                    .trim()
-                    .substring(0, 200);
-
-                index.push({{
-                    title: title,
-                    pageId: page.id,
-                    section: section,
-                    headings: headings,
-                    content: page.content.toLowerCase(),
-                    preview: preview
-                }});
-            }}
-            return index;
-        }}
-
-        const searchIndex = buildSearchIndex();
-
-        // Search function
-        function search(query) {{
-            if (!query || query.length < 2) return [];
-
-            const q = query.toLowerCase().trim();
-            const results = [];
-
-            for (const item of searchIndex) {{
-                let score = 0;
-                let matchedHeading = null;
-                let matchContext = '';
-
-                // Check title (highest priority)
-                const titleLower = item.title.toLowerCase();
-                if (titleLower === q) {{
-                    score = 100;
-                }} else if (titleLower.startsWith(q)) {{
-                    score = 80;
-                }} else if (titleLower.includes(q)) {{
-                    score = 60;
-                }}
-
-                // Check headings
-                for (const heading of item.headings) {{
-                    const headingLower = heading.toLowerCase();
-                    if (headingLower === q) {{
-                        score = Math.max(score, 50);
-                        matchedHeading = heading;
-                    }} else if (headingLower.includes(q)) {{
-                        score = Math.max(score, 40);
-                        if (!matchedHeading) matchedHeading = heading;
-                    }}
-                }}
-
-                // Check content
-                if (item.content.includes(q)) {{
-                    score = Math.max(score, 20);
-
-                    // Find context around the match
-                    const idx = item.content.indexOf(q);
-                    const start = Math.max(0, idx - 40);
-                    const end = Math.min(item.content.length, idx + q.length + 60);
-                    matchContext = item.content.substring(start, end);
-                    if (start > 0) matchContext = '...' + matchContext;
-                    if (end < item.content.length) matchContext = matchContext + '...';
-                }}
-
-                if (score > 0) {{
-                    results.push({{
-                        title: item.title,
-                        pageId: item.pageId,
-                        section: item.section,
-                        score: score,
-                        matchedHeading: matchedHeading,
-                        preview: matchContext || item.preview,
-                        query: q
-                    }});
-                }}
-            }}
-
-            // Sort by score descending
-            results.sort((a, b) => b.score - a.score);
-
-            return results.slice(0, 10);  // Limit to 10 results
-        }}
-
-        // Highlight query in text
-        function highlightText(text, query) {{
-            if (!query) return text;
-            const regex = new RegExp(`(${{query.replace(/[.*+?^${{}}()|[\\]\\\\]/g, '\\\\$&')}})`, 'gi');
-            return text.replace(regex, '<mark>$1</mark>');
-        }}
-
-        // Render search results
-        function renderResults(results, query) {{
-            const liveRegion = document.getElementById('searchLiveRegion');
-            if (results.length === 0) {{
-                searchResults.innerHTML = '<div class="search-no-results" role="status">No results found</div>';
-                searchInput.setAttribute('aria-expanded', 'true');
-                if (liveRegion) liveRegion.textContent = 'No results found';
-                return;
-            }}
-
-            const html = results.map((result, index) => {{
-                const titleHtml = highlightText(result.title, query);
-                const previewHtml = highlightText(result.preview, query);
-                const selectedClass = index === selectedIndex ? ' selected' : '';
-                const ariaSelected = index === selectedIndex ? 'true' : 'false';
-                const resultId = 'search-result-' + index;
-
-                return `
-                    <div class="search-result${{selectedClass}}" id="${{resultId}}" role="option" aria-selected="${{ariaSelected}}" data-index="${{index}}" data-page="${{result.pageId}}">
-                        ${{result.section ? `<div class="search-result-section">${{result.section}}</div>` : ''}}
-                        <div class="search-result-title">${{titleHtml}}</div>
-                        ${{result.matchedHeading ? `<div class="search-result-preview">${{highlightText(result.matchedHeading, query)}}</div>` : ''}}
-                        <div class="search-result-preview">${{previewHtml}}</div>
-                    </div>
-                `;
-            }}).join('');
-
-            searchResults.innerHTML = html;
-            searchInput.setAttribute('aria-expanded', 'true');
-
-            // Update active descendant for screen readers
-            if (selectedIndex >= 0) {{
-                searchInput.setAttribute('aria-activedescendant', 'search-result-' + selectedIndex);
-            }} else {{
-                searchInput.removeAttribute('aria-activedescendant');
-            }}
-
-            // Announce result count to screen readers
-            if (liveRegion) {{
-                liveRegion.textContent = results.length + ' result' + (results.length === 1 ? '' : 's') + ' found';
-            }}
-
-            // Add click handlers
-            searchResults.querySelectorAll('.search-result').forEach(el => {{
-                el.addEventListener('click', () => {{
-                    const pageId = el.dataset.page;
-                    loadPage(pageId);
-                    closeSearch();
-                }});
-            }});
-        }}
-
-        // Show search results
-        function showResults() {{
-            searchResults.classList.add('active');
-        }}
-
-        // Hide search results
-        function hideResults() {{
-            searchResults.classList.remove('active');
-            searchInput.setAttribute('aria-expanded', 'false');
-            searchInput.removeAttribute('aria-activedescendant');
-            selectedIndex = -1;
-        }}
-
-        // Close search (mobile)
-        function closeSearch() {{
-            hideResults();
-            searchInput.value = '';
-            searchInput.blur();
-            if (window.innerWidth < 769) {{
-                searchContainer.classList.remove('active');
-            }}
-        }}
-
-        // Debounce function
-        function debounce(func, wait) {{
-            let timeout;
-            return function executedFunction(...args) {{
-                const later = () => {{
-                    clearTimeout(timeout);
-                    func(...args);
-                }};
-                clearTimeout(timeout);
-                timeout = setTimeout(later, wait);
-            }};
-        }}
-
-        // Handle search input
-        const handleSearch = debounce((query) => {{
-            currentResults = search(query);
-            if (query.length >= 2) {{
-                renderResults(currentResults, query);
-                showResults();
-            }} else {{
-                hideResults();
-            }}
-        }}, 150);
-
-        searchInput.addEventListener('input', (e) => {{
-            handleSearch(e.target.value);
-        }});
-
-        // Handle keyboard navigation
-        searchInput.addEventListener('keydown', (e) => {{
-            if (!searchResults.classList.contains('active')) return;
-
-            if (e.key === 'ArrowDown') {{
-                e.preventDefault();
-                selectedIndex = Math.min(selectedIndex + 1, currentResults.length - 1);
-                renderResults(currentResults, searchInput.value);
-            }} else if (e.key === 'ArrowUp') {{
-                e.preventDefault();
-                selectedIndex = Math.max(selectedIndex - 1, -1);
-                renderResults(currentResults, searchInput.value);
-            }} else if (e.key === 'Enter') {{
-                e.preventDefault();
-                if (selectedIndex >= 0 && currentResults[selectedIndex]) {{
-                    loadPage(currentResults[selectedIndex].pageId);
-                    closeSearch();
-                }} else if (currentResults.length > 0) {{
-                    loadPage(currentResults[0].pageId);
-                    closeSearch();
-                }}
-            }} else if (e.key === 'Escape') {{
-                closeSearch();
-            }}
-        }});
-
-        // Close results when clicking outside
-        document.addEventListener('click', (e) => {{
-            if (!searchContainer.contains(e.target)) {{
-                hideResults();
-            }}
-        }});
-
-        // Focus search on input click
-        searchInput.addEventListener('focus', () => {{
-            if (searchInput.value.length >= 2) {{
-                handleSearch(searchInput.value);
-            }}
-        }});
-
-        // Global keyboard shortcut (Ctrl+K or Cmd+K)
-        document.addEventListener('keydown', (e) => {{
-            if ((e.ctrlKey || e.metaKey) && e.key === 'k') {{
-                e.preventDefault();
-                if (window.innerWidth < 769) {{
-                    searchContainer.classList.add('active');
-                }}
-                searchInput.focus();
-            }}
-            if (e.key === 'Escape') {{
-                closeSearch();
-            }}
-        }});
-
-        // Mobile search toggle
-        if (searchToggle) {{
-            searchToggle.addEventListener('click', () => {{
-                searchContainer.classList.toggle('active');
-                if (searchContainer.classList.contains('active')) {{
-                    searchInput.focus();
-                }}
-            }});
-        }}
-
-        // Language switcher
-        function switchLanguage(filename) {{
-            const currentHash = window.location.hash;
-            window.location.href = filename + currentHash;
-        }}
-
-        // Load initial page
-        const initialHash = window.location.hash.substring(1);
-        const firstPageId = Object.values(PAGES)[0].id;
-        loadPage(initialHash || firstPageId);
-    </script>
+    <!-- Documentation data (decoded on demand) -->
+{data_html}
+
+{scripts_html}
 </body>
 </html>'''
 
+
+def generate_html(docs, logo_data, lang='en', compress=False, assets=None, store=None,
+                  store_url=STORE_DIR.name, version_options_html='', index_in_store=False):
+    """Generate the complete HTML document.
+
+    Args:
+        docs: Dictionary of documentation pages
+        logo_data: Base64 encoded logo image
+        lang: Language code for this build
+        compress: Deflate-compress page content and the search index
+        assets: Viewer stylesheet and scripts from load_viewer_assets()
+        store: Shared page store (hash -> content). When given, page content
+            is added to it and fetched by the viewer from store_url instead
+            of being embedded
+        store_url: URL of the store directory, relative to the HTML file
+        version_options_html: <option>s of the version switcher, if any
+        index_in_store: Put the search index and code highlights in the
+            store too, one entry per page (fetched when first needed), so
+            pages unchanged between builds share them
+    """
+
+    navigation_html = build_navigation(docs)
+
+    # Generate page content (embedded as JSON)
+    # Page metadata is parsed eagerly; it is all navigation needs. Outbound
+    # links drive the viewer's idle-time prefetching; related pages are
+    # listed under each page.
+    page_links = extract_page_links(docs)
+    related = load_related_pages(docs, page_links)
+    pages_meta = [
+        {'title': title, 'id': info['id'], 'links': page_links[info['id']], 'related': related[info['id']]}
+        for title, info in docs.items()
+    ]
+
+    meta = {'pages': pages_meta}
+    if store is None:
+        # Page content is embedded as inert data blocks, decoded when first opened
+        page_blocks_html = '\n'.join(
+            '    ' + data_block(f'page-data-{info["id"]}', info['content'], compress)
+            for info in docs.values()
+        )
+    else:
+        # Pages reference shared store entries, fetched when first opened
+        for page, info in zip(pages_meta, docs.values()):
+            page['hash'] = add_to_store(store, info['content'])
+        meta['store'] = store_url
+        page_blocks_html = ''
+
+    # Inverted search index (word terms, or character bigrams for CJK text),
+    # decoded on first search, and the highlighted code blocks, decoded
+    # before the first page is rendered. Both are always compressed: the
+    # index is only needed once a search starts, and the highlights shrink
+    # to a third. Versioned builds store them per page instead, so a page
+    # unchanged between versions shares its entries; the viewer merges the
+    # page indexes on first search.
+    data_blocks = []
+    if store is not None and index_in_store:
+        for page, (title, info) in zip(pages_meta, docs.items()):
+            page_docs = {title: info}
+            page['index'] = add_to_store(
+                store, json.dumps(build_search_index(page_docs), ensure_ascii=False, separators=(',', ':')), '.json')
+            highlights = code_highlights(page_docs)
+            if highlights:
+                page['highlights'] = add_to_store(store, json.dumps(highlights, separators=(',', ':')), '.json')
+    else:
+        for block_id, value in (('search-index', build_search_index(docs)),
+                                ('code-highlights', code_highlights(docs))):
+            data_blocks.append(data_block(block_id, value, compress=True))
+    meta_block = data_block('docs-meta', meta)
+
+    # Stylesheet and scripts come from assets/ (minified unless --no-minify)
+    if assets is None:
+        assets = load_viewer_assets()
+    viewer_css = assets['css'][0]
+    viewer_js = assets['js'][0]
+
+    # Pure-JS inflate for compressed blocks in browsers without
+    # DecompressionStream (the embedded search index and highlights are
+    # always compressed)
+    inflate_script = (f'    <script>\n{assets["inflate"][0]}\n    </script>\n'
+                      if compress or not index_in_store else '')
+
+    page_title = MANUAL_TITLES.get(lang, MANUAL_TITLES['en'])
+
+    # Generate language switcher options
+    lang_options = []
+    for code, name in SUPPORTED_LANGUAGES.items():
+        filename = 'docs.html' if code == 'en' else f'docs-{code}.html'
+        selected = 'selected' if code == lang else ''
+        lang_options.append(f'<option value="{filename}" {selected}>{name}</option>')
+    lang_options_html = '\n'.join(lang_options)
+
+    html = render_shell(
+        lang, page_title, page_title,
+        head_html=f'    <style>\n{viewer_css}\n    </style>',
+        logo_src=logo_data,
+        lang_options_html=lang_options_html,
+        navigation_html=navigation_html,
+        content_html='',
+        data_html=''.join(f'    {block}\n' for block in [meta_block] + data_blocks) + page_blocks_html,
+        scripts_html=f'{inflate_script}    <script>\n{viewer_js}\n    </script>',
+        version_options_html=version_options_html,
+    )
+
     return html
 
 
-def generate_llm_txt(docs, lang='en'):
-    """Generate LLM-friendly plain text documentation.
+def generate_site(docs, lang, store, client_nav=False, manifest=None, languages=None):
+    """Write one prerendered HTML file per page under site/<lang>/<page-id>/.
 
-    Creates a single text file optimized for LLM context windows:
-    - Clear structure with section markers
-    - All documentation concatenated
-    - No HTML/CSS/JS overhead
-    - Easy to parse and understand
+    Pages share the stylesheet, script and logo in site/assets/ and page
+    content in the site's store; the search index is a separate file
+    fetched on first search. The viewer script only enhances the page:
+    with client_nav it loads other pages in place instead of following
+    links. The language menu offers the languages the site has been built
+    in (default: all supported ones). Returns the number of pages written
+    (unchanged pages are left untouched).
+    """
+    lang_dir = SITE_DIR / lang
+    # Every page embeds the metadata (and store hash) of all pages
+    sources = [info['source'] for info in docs.values()]
+    page_ids = {info['id'] for info in docs.values()}
+    page_links = extract_page_links(docs)
+    related = load_related_pages(docs, page_links)
+    pages_meta = [
+        {'title': title, 'id': info['id'], 'links': page_links[info['id']], 'related': related[info['id']],
+         'hash': add_to_store(store, info['content'])}
+        for title, info in docs.items()
+    ]
+    manual_title = MANUAL_TITLES.get(lang, MANUAL_TITLES['en'])
+    logo_src = '../../assets/logo.png' if (SITE_DIR / 'assets' / 'logo.png').exists() else ''
+
+    write_artifact(lang_dir / 'search-index.json',
+                   json.dumps(build_search_index(docs), ensure_ascii=False, separators=(',', ':')),
+                   manifest, sources, lang=lang, pages=len(docs))
+    write_artifact(lang_dir / 'code-highlights.json',
+                   json.dumps(code_highlights(docs), ensure_ascii=False, separators=(',', ':')),
+                   manifest, sources, lang=lang, pages=len(docs))
+
+    written = 0
+    for title, info in docs.items():
+        page_id = info['id']
+        nav_title = title.split(' -> ')[-1] if ' -> ' in title else title
+        lang_options_html = '\n'.join(
+            f'<option value="../../{code}/{page_id}/" {"selected" if code == lang else ""}>{name}</option>'
+            for code, name in SUPPORTED_LANGUAGES.items()
+            if languages is None or code in languages
+        )
+        meta_block = data_block('docs-meta', {
+            'pages': pages_meta,
+            'store': '../../store',
+            'searchIndex': '../search-index.json',
+            'codeHighlights': '../code-highlights.json',
+            'site': {'page': page_id, 'clientNav': client_nav},
+        })
+        html = render_shell(
+            lang, f'{nav_title} - {manual_title}', manual_title,
+            head_html='    <link rel="stylesheet" href="../../assets/viewer.css">',
+            logo_src=logo_src,
+            lang_options_html=lang_options_html,
+            navigation_html=build_navigation(docs, site=True, active_id=page_id),
+            content_html=render_blocks(info['document'], page_ids),
+            data_html=f'    {meta_block}',
+            scripts_html='    <script src="../../assets/viewer.js"></script>',
+        )
+        if write_artifact(lang_dir / page_id / 'index.html', html, manifest, sources, lang=lang, pages=1):
+            written += 1
+
+    # The language root opens the first page
+    first_id = next(iter(docs.values()))['id']
+    write_artifact(lang_dir / 'index.html', redirect_html(f'{first_id}/'), manifest, lang=lang)
+
+    return written
+
+
+def redirect_html(url):
+    """A minimal page that forwards the browser to url."""
+    return (f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n'
+            f'<meta http-equiv="refresh" content="0; url={url}">\n'
+            f'<link rel="canonical" href="{url}">\n</head>\n'
+            f'<body><a href="{url}">{url}</a></body>\n</html>\n')
+
+
+def write_site_assets(assets, logo_path, manifest=None):
+    """Write the stylesheet, script and logo shared by all site pages."""
+    assets_dir = SITE_DIR / 'assets'
+    for name, filename in (('css', 'viewer.css'), ('js', 'viewer.js')):
+        write_artifact(assets_dir / filename, textwrap.dedent(assets[name][0]) + '\n',
+                       manifest, [ASSETS_DIR / filename])
+    if source_exists(logo_path):
+        write_artifact(assets_dir / 'logo.png', read_source(logo_path), manifest, [logo_path])
+    write_artifact(SITE_DIR / 'index.html', redirect_html('en/'), manifest)
+
+
+def llm_txt_parts(docs, lang='en'):
+    """Split the LLM text into literal text and per-page content parts.
+
+    Returns a list whose items are either strings or ('page', text) tuples;
+    concatenated in order they form the llms.txt document.
     """
+    parts = []
     lines = []
 
     # Language-specific header text
@@ -2711,10 +2925,10 @@ def generate_llm_txt(docs, lang='en'):
         lines.append("-" * 80)
         lines.append("")
 
-        # Page content (strip trailing whitespace from each line)
-        content = info['content']
-        for line in content.split('\n'):
-            lines.append(line.rstrip())
+        # Page content (trailing whitespace stripped from each line)
+        parts.append('\n'.join(lines) + '\n')
+        parts.append(('page', info['document']['text']))
+        lines = ['']
 
     # Footer
     lines.append("")
@@ -2723,11 +2937,677 @@ def generate_llm_txt(docs, lang='en'):
     lines.append("END OF DOCUMENTATION")
     lines.append("=" * 80)
 
-    return '\n'.join(lines)
+    parts.append('\n'.join(lines))
+    return parts
+
+
+def generate_llm_txt(docs, lang='en'):
+    """Generate LLM-friendly plain text documentation.
+
+    Creates a single text file optimized for LLM context windows:
+    - Clear structure with section markers
+    - All documentation concatenated
+    - No HTML/CSS/JS overhead
+    - Easy to parse and understand
+    """
+    return ''.join(part if isinstance(part, str) else part[1] for part in llm_txt_parts(docs, lang))
+
+
+def generate_llm_recipe(docs, lang, store):
+    """Describe the LLM text as literal parts and shared store references.
+
+    Page content is added to the store; the server concatenates the
+    recipe's strings and {"page": hash} entries to rebuild llms.txt.
+    """
+    return [
+        part if isinstance(part, str) else {'page': add_to_store(store, part[1])}
+        for part in llm_txt_parts(docs, lang)
+    ]
 
 
-def build_for_language(lang, logo_data):
-    """Build documentation for a specific language."""
+# Pieces counted by estimate_tokens(): a CJK character, a word or a symbol
+TOKEN_ESTIMATE_RE = re.compile(f'[{CJK_CHARS}]|(?:(?![{CJK_CHARS}])\\w)+|[^\\w\\s]')
+
+
+def estimate_tokens(text):
+    """Approximate the number of LLM tokens in text.
+
+    CJK characters and symbols count as one token each, words as one
+    token per six characters or part thereof. Close enough to common BPE
+    tokenizers for sizing and budgeting, without depending on one.
+    """
+    return sum((len(piece) + 5) // 6 for piece in TOKEN_ESTIMATE_RE.findall(text))
+
+
+def section_spans(document, line_count):
+    """(section, first line, end line) of each section of a parsed page."""
+    sections = document['sections']
+    return [
+        (section, section['line'], sections[i + 1]['line'] if i + 1 < len(sections) else line_count)
+        for i, section in enumerate(sections)
+    ]
+
+
+def llm_chunks(parts, docs):
+    """Locate each page and section of the LLM text.
+
+    Takes the parts from llm_txt_parts(). Returns (pages, chunks): index
+    entries giving each page's and section's byte offset and length within
+    the assembled text, its token estimate and chunk file, and
+    {chunk file: text}. Chunk files hold exactly those bytes; pages are
+    <page-id>.txt and their sections <page-id>/<n>.txt.
+    """
+    pages = []
+    chunks = {}
+    offset = 0
+    docs_iter = iter(docs.items())
+    for part in parts:
+        if isinstance(part, str):
+            offset += len(part.encode('utf-8'))
+            continue
+        title, info = next(docs_iter)
+        text = part[1]
+        page_id = info['id']
+        length = len(text.encode('utf-8'))
+        chunks[f'{page_id}.txt'] = text
+        spans = section_spans(info['document'], text.count('\n') + 1)
+        entry = {
+            'id': page_id,
+            'title': title.split(' -> ')[-1],
+            'section': info['section'],
+            'offset': offset,
+            'length': length,
+            # Counted pieces never span lines, so sections add up to the page
+            'tokens': sum(section['tokens'] for section, _, _ in spans),
+            'file': f'{page_id}.txt',
+            'sections': [],
+        }
+
+        # The page text keeps the source's lines, so sections split on them
+        lines = text.split('\n')
+        line_offsets = [0]
+        for line in lines:
+            line_offsets.append(line_offsets[-1] + len(line.encode('utf-8')) + 1)
+        for i, (section, start, end) in enumerate(spans):
+            section_text = '\n'.join(lines[start:end])
+            name = f'{page_id}/{i}.txt'
+            chunks[name] = section_text
+            entry['sections'].append({
+                'id': section['id'],
+                'heading': section['heading'],
+                'offset': offset + line_offsets[start],
+                'length': len(section_text.encode('utf-8')),
+                'tokens': section['tokens'],
+                'file': name,
+            })
+
+        pages.append(entry)
+        offset += length
+    return pages, chunks
+
+
+def write_llm_chunks(parts, docs, lang, manifest=None, sources=()):
+    """Write the page/section chunk files and llms-index*.json of a language.
+
+    Chunks go to llms/<lang>/; files left there by earlier builds for
+    pages or sections that no longer exist are removed.
+    """
+    name = 'llms' if lang == 'en' else f'llms-{lang}'
+    text = ''.join(part if isinstance(part, str) else part[1] for part in parts).encode('utf-8')
+    pages, chunks = llm_chunks(parts, docs)
+    chunk_dir = LLM_CHUNKS_DIR / lang
+
+    for chunk_name, chunk_text in chunks.items():
+        write_artifact(chunk_dir / chunk_name, chunk_text)
+    if chunk_dir.exists():
+        for path in chunk_dir.rglob('*.txt'):
+            if path.relative_to(chunk_dir).as_posix() not in chunks:
+                path.unlink()
+
+    index = {
+        'file': f'{name}.txt',
+        'size': len(text),
+        'sha256': hashlib.sha256(text).hexdigest(),
+        'tokens': sum(page['tokens'] for page in pages),
+        'chunks': f'{relative_path(chunk_dir)}/',
+        'pages': pages,
+    }
+    index_file = LLM_OUTPUT_FILE.parent / ('llms-index.json' if lang == 'en' else f'llms-index-{lang}.json')
+    write_artifact(index_file, json.dumps(index, ensure_ascii=False, separators=(',', ':')),
+                   manifest, sources, lang=lang, pages=len(docs))
+    return len(chunks), index['tokens']
+
+
+# Number of earlier llms text versions that deltas are kept for
+LLM_DELTA_HISTORY = 10
+
+
+def write_llm_deltas(parts, docs, lang, manifest=None):
+    """Write deltas updating earlier versions of a language's LLM text.
+
+    llms-delta/<lang>/history.json keeps the page hashes of the last
+    LLM_DELTA_HISTORY versions of the text. For each of them,
+    llms-delta/<lang>/<sha256[:16]>.json holds the delta from that version
+    to the current one: the new sha256, the content of changed and added
+    pages, the removed page ids, and the parts to assemble the new text
+    from (literal strings and {"page": page id}). Returns the number of
+    deltas kept.
+    """
+    lang_dir = LLM_DELTA_DIR / lang
+    sha256 = hashlib.sha256(
+        ''.join(part if isinstance(part, str) else part[1] for part in parts).encode('utf-8')).hexdigest()
+
+    pages = {}
+    recipe = []
+    docs_iter = iter(docs.values())
+    for part in parts:
+        if isinstance(part, str):
+            recipe.append(part)
+        else:
+            page_id = next(docs_iter)['id']
+            pages[page_id] = part[1]
+            recipe.append({'page': page_id})
+    page_hashes = {page_id: content_hash(text) for page_id, text in pages.items()}
+
+    history_file = lang_dir / 'history.json'
+    try:
+        history = json.loads(history_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        history = []
+    if not history or history[-1]['sha256'] != sha256:
+        history.append({'sha256': sha256, 'pages': page_hashes})
+        history = history[-LLM_DELTA_HISTORY:]
+    write_artifact(history_file, json.dumps(history, indent=1) + '\n', manifest, lang=lang)
+
+    kept = {'history.json'}
+    for state in history:
+        delta = {
+            'since': state['sha256'],
+            'sha256': sha256,
+            'changed': {page_id: text for page_id, text in pages.items()
+                        if state['pages'].get(page_id) != page_hashes[page_id]},
+            'removed': [page_id for page_id in state['pages'] if page_id not in pages],
+            'parts': recipe,
+        }
+        name = f"{state['sha256'][:16]}.json"
+        write_artifact(lang_dir / name, json.dumps(delta, ensure_ascii=False, separators=(',', ':')))
+        kept.add(name)
+    for path in lang_dir.glob('*.json'):
+        if path.name not in kept:
+            path.unlink()
+    return len(history)
+
+
+def corpus_records(docs, lang):
+    """Yield the retrieval corpus records of a language, one per section.
+
+    Each record has a stable id (<lang>:<page-id>#<anchor id>, which only
+    changes if the page or heading is renamed), the page id and title, the
+    section path (headings from the top of the page down to the section),
+    the section text with its token estimate and a hash of the text.
+    """
+    for title, info in docs.items():
+        document = info['document']
+        levels = {heading['id']: heading['level'] for heading in document['headings']}
+        lines = document['text'].split('\n')
+        trail = []  # (level, heading) of the enclosing sections
+        for section, start, end in section_spans(document, len(lines)):
+            if section['heading'] is not None:
+                level = levels[section['id']]
+                while trail and trail[-1][0] >= level:
+                    trail.pop()
+                trail.append((level, section['heading']))
+            text = '\n'.join(lines[start:end])
+            yield {
+                'id': f"{lang}:{info['id']}#{section['id']}",
+                'page': info['id'],
+                'title': title.split(' -> ')[-1],
+                'path': [heading for _, heading in trail],
+                'lang': lang,
+                'text': text,
+                'tokens': section['tokens'],
+                'hash': hashlib.sha256(text.encode('utf-8')).hexdigest()[:16],
+            }
+
+
+def write_corpus(docs, lang, manifest=None, sources=()):
+    """Stream a language's corpus to corpus/<lang>.ndjson, with a diff.
+
+    When the corpus changes, corpus/<lang>.diff.json lists the chunk ids
+    added, changed and removed since the previous corpus (identified by
+    its sha256 in "since"), so consumers only re-embed those chunks.
+    Returns (chunks, added, changed, removed), or None if the corpus is
+    unchanged.
+    """
+    path = CORPUS_DIR / f'{lang}.ndjson'
+    previous = {}
+    previous_sha = None
+    try:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for line in f:
+                digest.update(line)
+                record = json.loads(line)
+                previous[record['id']] = record['hash']
+        previous_sha = digest.hexdigest()
+    except (OSError, ValueError, KeyError):
+        previous = {}
+
+    current = {}
+
+    def lines():
+        for record in corpus_records(docs, lang):
+            current[record['id']] = record['hash']
+            yield json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    written, sha256 = stream_artifact(path, lines(), manifest, sources, lang=lang, pages=len(docs))
+    if not written:
+        return None
+
+    diff = {
+        'since': previous_sha,
+        'sha256': sha256,
+        'added': [chunk for chunk in current if chunk not in previous],
+        'changed': [chunk for chunk in current if chunk in previous and previous[chunk] != current[chunk]],
+        'removed': [chunk for chunk in previous if chunk not in current],
+    }
+    write_artifact(CORPUS_DIR / f'{lang}.diff.json', json.dumps(diff, ensure_ascii=False, indent=1) + '\n',
+                   manifest, lang=lang)
+    return len(current), len(diff['added']), len(diff['changed']), len(diff['removed'])
+
+
+# Token budget of llms-small*.txt
+LLM_SMALL_BUDGET = 50000
+
+# Page id prefixes in the order llms-small*.txt includes them; other pages
+# (the welcome page) are left out
+LLM_SMALL_PRIORITY = ('language-reference', 'getting-started', 'reference', 'language-guide',
+                      'advanced', 'hpm', 'design', 'contributing')
+
+LLM_SMALL_DROP_RE = re.compile(r'\s*(?:-{3,}|\*{3,}|_{3,}|!\[[^\]]*\]\([^)]*\)|<!--.*-->)\s*')
+
+
+def condense_markdown(text, seen_code):
+    """Strip decoration from markdown for the condensed LLM text.
+
+    Drops rules, images and HTML comments, turns links to other pages into
+    plain text and collapses blank lines. Code blocks whose normalised
+    content is in seen_code, or earlier in text, are dropped. Returns
+    (text, normalised content of the code blocks kept).
+    """
+    lines = []
+    kept_code = set()
+    code = None
+    for line in text.split('\n'):
+        line = line.rstrip()
+        if line.strip().startswith('```'):
+            if code is None:
+                code = [line]
+                continue
+            code.append(line)
+            key = '\n'.join(line.strip() for line in code[1:-1] if line.strip())
+            if key not in seen_code and key not in kept_code:
+                kept_code.add(key)
+                lines.extend(code)
+            code = None
+            continue
+        if code is not None:
+            code.append(line)
+            continue
+        if LLM_SMALL_DROP_RE.fullmatch(line):
+            continue
+        line = re.sub(r'\[([^\]]+)\]\(#[^)]*\)', r'\1', line)
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    if code is not None:
+        lines.extend(code)
+    return '\n'.join(lines).strip('\n'), kept_code
+
+
+def generate_llm_small(docs, lang='en', budget=LLM_SMALL_BUDGET):
+    """Generate the condensed LLM text, llms-small.txt.
+
+    Sections are taken by page priority (LLM_SMALL_PRIORITY), then in
+    page order, while they fit in the token budget; sections that do not
+    fit are skipped in favour of later, smaller ones. Returns (text,
+    token estimate, sections included, sections considered).
+    """
+    lang_name = SUPPORTED_LANGUAGES.get(lang, 'English')
+    suffix = '' if lang == 'en' else f' ({lang_name})'
+    full_name = 'llms.txt' if lang == 'en' else f'llms-{lang}.txt'
+    header = (f"HEMLOCK PROGRAMMING LANGUAGE - CONDENSED DOCUMENTATION{suffix}\n"
+              f"The most important parts of {full_name}, condensed to a token budget.\n"
+              "Source: https://github.com/hemlang/hem-doc\n")
+    tokens = estimate_tokens(header)
+
+    def priority(page_id):
+        for rank, prefix in enumerate(LLM_SMALL_PRIORITY):
+            if page_id == prefix or page_id.startswith(prefix + '-'):
+                return rank
+        return None
+
+    ranked = sorted(
+        (priority(info['id']), order, title, info)
+        for order, (title, info) in enumerate(docs.items())
+        if priority(info['id']) is not None
+    )
+
+    seen_code = set()
+    pages = []
+    included = 0
+    considered = 0
+    for _, _, title, info in ranked:
+        nav_title = title.split(' -> ')[-1]
+        page_header = f"\n=== {nav_title} ===\n"
+        lines = info['document']['text'].split('\n')
+        sections = []
+        for section, start, end in section_spans(info['document'], len(lines)):
+            considered += 1
+            if seen_code.isdisjoint(section['condensed_code']):
+                # Dropping seen code changes nothing; use the cached form
+                text, text_tokens = section['condensed'], section['condensed_tokens']
+                section_code = set(section['condensed_code'])
+            else:
+                text, section_code = condense_markdown('\n'.join(lines[start:end]), seen_code)
+                text_tokens = estimate_tokens(text)
+            if not text or text == lines[start].strip():
+                continue
+            cost = text_tokens + (0 if sections else estimate_tokens(page_header))
+            if tokens + cost > budget:
+                continue
+            tokens += cost
+            # Code only counts as seen once its section is kept
+            seen_code |= section_code
+            sections.append(text)
+            included += 1
+        if sections:
+            pages.append(page_header + '\n' + '\n\n'.join(sections) + '\n')
+
+    return header + ''.join(pages), tokens, included, considered
+
+
+def write_llm_docs(docs, lang, store=None, manifest=None, version=None, small_budget=LLM_SMALL_BUDGET):
+    """Write a language's llms.txt, or its recipe in shared store builds.
+
+    Recipes go to store/, or to versions/<version>/ for version builds.
+    Except for version builds, the chunk files and index of the text (see
+    write_llm_chunks()), deltas from earlier versions of it (see
+    write_llm_deltas()), the condensed llms-small*.txt and the retrieval
+    corpus (see write_corpus()) are written too.
+    """
+    # llms.txt for English, llms-{lang}.txt for others
+    name = 'llms' if lang == 'en' else f'llms-{lang}'
+    llm_file = LLM_OUTPUT_FILE.parent / f'{name}.txt'
+    recipe_file = (STORE_DIR if version is None else VERSIONS_DIR / version) / f'{name}.json'
+    lang_name = SUPPORTED_LANGUAGES.get(lang, lang)
+    sources = [info['source'] for info in docs.values()]
+    info = {'lang': lang, 'pages': len(docs)}
+    if version is not None:
+        sources = [source for source in sources if _git_tree_for(source)[0] is None]
+        info['version'] = version
+
+    if version is None:
+        parts = llm_txt_parts(docs, lang)
+        chunk_count, tokens = write_llm_chunks(parts, docs, lang, manifest, sources)
+        chunk_status = f", {chunk_count} chunks, ~{tokens} tokens"
+        deltas = write_llm_deltas(parts, docs, lang, manifest)
+        chunk_status += f", {deltas} deltas"
+
+        small_file = LLM_OUTPUT_FILE.parent / ('llms-small.txt' if lang == 'en' else f'llms-small-{lang}.txt')
+        small_txt, small_tokens, included, considered = generate_llm_small(docs, lang, small_budget)
+        write_artifact(small_file, small_txt, manifest, sources, lang=lang, pages=len(docs))
+        print(f"  {lang_name}: {small_file.name} (~{small_tokens} of {small_budget} tokens, "
+              f"{included}/{considered} sections)")
+
+        corpus = write_corpus(docs, lang, manifest, sources)
+        if corpus:
+            print(f"  {lang_name}: corpus/{lang}.ndjson ({corpus[0]} chunks; "
+                  f"{corpus[1]} added, {corpus[2]} changed, {corpus[3]} removed)")
+    else:
+        chunk_status = ''
+
+    if store is not None:
+        # The server assembles llms.txt from the recipe and the store
+        recipe = generate_llm_recipe(docs, lang, store)
+        write_artifact(recipe_file, json.dumps(recipe, ensure_ascii=False), manifest, sources, **info)
+        print(f"  {lang_name}: {relative_path(recipe_file)} ({len(recipe)} parts{chunk_status})")
+        # A text file from an earlier build would go stale next to the recipe
+        if version is None and llm_file.exists():
+            llm_file.unlink()
+            if manifest is not None:
+                manifest['artifacts'].pop(relative_path(llm_file), None)
+        return
+
+    llm_txt = generate_llm_txt(docs, lang)
+    changed = write_artifact(llm_file, llm_txt, manifest, sources, **info)
+
+    # A recipe from an earlier --shared-store build would shadow this file
+    if recipe_file.exists():
+        recipe_file.unlink()
+        if manifest is not None:
+            manifest['artifacts'].pop(relative_path(recipe_file), None)
+
+    status = '' if changed else ', unchanged'
+    print(f"  {lang_name}: {llm_file.name} ({len(llm_txt)} characters{chunk_status}{status})")
+
+
+# Schema version of docs.sqlite; a database with another version is rebuilt
+SEARCH_DB_VERSION = 2
+
+# bm25() column weights: page title, heading, body (the other columns are
+# not indexed)
+SEARCH_DB_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def search_db_rows(title, info):
+    """Rows of a page in the search database.
+
+    One row per section (kind "page" for the text before the first
+    heading, "section" otherwise) and one per code block, which takes the
+    anchor of the section it appears in. Indexed columns hold the text as
+    search terms (see search_terms()), so CJK text is already split into
+    bigrams; the original heading and text are stored alongside for display.
+    """
+    document = info['document']
+    title_terms = ' '.join(search_terms(title))
+    lines = document['text'].split('\n')
+    spans = section_spans(document, len(lines))
+    rows = []
+    for section, _, _ in spans:
+        heading = section['heading'] or ''
+        rows.append((title_terms, ' '.join(search_terms(heading)), ' '.join(search_terms(section['text'])),
+                     info['id'], section['id'], 'section' if section['heading'] else 'page',
+                     heading, section['text']))
+    current = 0
+    for block in document['code']:
+        for i in range(current, len(spans)):
+            section, start, end = spans[i]
+            if block['code'].rstrip('\n') in '\n'.join(lines[start:end]):
+                current = i
+                break
+        section = spans[current][0] if spans else {'id': '', 'heading': None}
+        heading = section['heading'] or ''
+        rows.append((title_terms, ' '.join(search_terms(heading)), ' '.join(search_terms(block['code'])),
+                     info['id'], section['id'], 'code', heading, block['code']))
+    return rows
+
+
+def search_table(lang):
+    """Name of a language's FTS5 table (lang becomes part of the SQL, so it is checked)."""
+    if lang not in SUPPORTED_LANGUAGES:
+        raise ValueError(f"Unknown language '{lang}'")
+    return f'fts_{lang}'
+
+
+def open_search_db(path=SEARCH_DB_FILE):
+    """Open the search database, starting afresh if its schema is outdated."""
+    db = sqlite3.connect(path, isolation_level=None)
+    if db.execute('PRAGMA user_version').fetchone()[0] != SEARCH_DB_VERSION:
+        db.close()
+        path.unlink()
+        db = sqlite3.connect(path, isolation_level=None)
+        db.execute('CREATE TABLE pages (lang TEXT, id TEXT, title TEXT, hash TEXT, '
+                   'PRIMARY KEY (lang, id)) WITHOUT ROWID')
+        db.execute(f'PRAGMA user_version = {SEARCH_DB_VERSION}')
+    return db
+
+
+def write_search_db(built_docs, manifest=None, path=SEARCH_DB_FILE):
+    """Update docs.sqlite, the full-text search database of the docs.
+
+    Each language has an FTS5 table fts_<lang> (see search_db_rows()).
+    Queries only look up single terms, so the tables keep no positions
+    (detail=none); the pages table holds each page's title and content
+    hash. Only pages
+    whose hash changed are reindexed, and pages that are gone are removed,
+    all in one transaction. built_docs maps languages to their docs.
+    Returns {lang: (pages reindexed, pages removed)}.
+    """
+    db = open_search_db(path)
+    stats = {}
+    try:
+        db.execute('BEGIN')
+        for lang, docs in built_docs.items():
+            table = search_table(lang)
+            db.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5('
+                       'title_terms, heading_terms, body_terms, page UNINDEXED, anchor UNINDEXED, '
+                       "kind UNINDEXED, heading UNINDEXED, body UNINDEXED, tokenize = \"unicode61 tokenchars '_'\", "
+                       'detail = none)')
+            stored = dict(db.execute('SELECT id, hash FROM pages WHERE lang = ?', (lang,)))
+            current = {}
+            updated = 0
+            for title, info in docs.items():
+                title = title.split(' -> ')[-1]
+                page_hash = content_hash(f"{title}\0{info['content']}")
+                current[info['id']] = page_hash
+                if stored.get(info['id']) == page_hash:
+                    continue
+                if info['id'] in stored:
+                    db.execute(f'DELETE FROM {table} WHERE page = ?', (info['id'],))
+                db.executemany(f'INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?)', search_db_rows(title, info))
+                db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)',
+                           (lang, info['id'], title, page_hash))
+                updated += 1
+            removed = [page_id for page_id in stored if page_id not in current]
+            for page_id in removed:
+                db.execute(f'DELETE FROM {table} WHERE page = ?', (page_id,))
+                db.execute('DELETE FROM pages WHERE lang = ? AND id = ?', (lang, page_id))
+            if updated or removed:
+                db.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+            stats[lang] = (updated, len(removed))
+        db.execute('COMMIT')
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+    finally:
+        languages = sorted(lang for lang, in db.execute('SELECT DISTINCT lang FROM pages'))
+        pages = db.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+        db.close()
+
+    if manifest is not None:
+        record_artifact(manifest, path, file_sha256(path), path.stat().st_size,
+                        info={'languages': languages, 'pages': pages})
+    return stats
+
+
+def query_search_db(terms, lang='en', limit=10, path=SEARCH_DB_FILE):
+    """Search docs.sqlite; returns the best matches, best first.
+
+    The query is split into search terms like the indexed text. Rows
+    matching all terms are ranked by bm25(); if there are none, rows
+    matching any of them are. Each match is a dict with the page id and
+    title, anchor, kind, heading, text and score (lower is better).
+    """
+    words = list(dict.fromkeys(search_terms(terms)))
+    if not words:
+        return []
+    quoted = ['"' + word.replace('"', '""') + '"' for word in words]
+    table = search_table(lang)
+    db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        for operator in (' AND ', ' OR '):
+            rows = db.execute(
+                f'SELECT f.page, p.title, f.anchor, f.kind, f.heading, f.body, '
+                f'bm25({table}, {", ".join(map(str, SEARCH_DB_WEIGHTS))}) AS score '
+                f'FROM {table} f JOIN pages p ON p.lang = ? AND p.id = f.page '
+                f'WHERE {table} MATCH ? ORDER BY score LIMIT ?',
+                (lang, operator.join(quoted), limit)).fetchall()
+            if rows or len(quoted) == 1:
+                break
+    finally:
+        db.close()
+    keys = ('page', 'title', 'anchor', 'kind', 'heading', 'text', 'score')
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def search_snippet(text, terms, width=100):
+    """The first line of text containing one of the terms, shortened to width."""
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    lines = [line for line in lines if not line.startswith('#')] or lines
+    words = set(search_terms(terms))
+    for line in lines:
+        if words & set(search_terms(line)):
+            break
+    else:
+        line = lines[0] if lines else ''
+    return line if len(line) <= width else line[:width - 1] + '…'
+
+
+def query_main(argv):
+    """The "query" command: search docs.sqlite from the terminal."""
+    parser = argparse.ArgumentParser(prog='build_docs.py query',
+                                     description='Search the documentation database (docs.sqlite)')
+    parser.add_argument('terms', help='Search terms')
+    parser.add_argument('--lang', '-l', default='en', choices=list(SUPPORTED_LANGUAGES),
+                        help='Language to search (default: en)')
+    parser.add_argument('--limit', '-n', type=int, default=10, help='Number of results (default: 10)')
+    args = parser.parse_args(argv)
+
+    if not SEARCH_DB_FILE.exists():
+        print(f"Error: {SEARCH_DB_FILE.name} not found; run build_docs.py first")
+        sys.exit(1)
+    try:
+        results = query_search_db(args.terms, args.lang, args.limit)
+    except sqlite3.OperationalError:
+        print(f"Error: no search index for language '{args.lang}' in {SEARCH_DB_FILE.name}")
+        sys.exit(1)
+    if not results:
+        print("No results")
+        return
+    for result in results:
+        location = f"#{result['page']}" + (f"/{result['anchor']}" if result['kind'] != 'page' else '')
+        heading = f" > {result['heading']}" if result['heading'] else ''
+        label = ' [code]' if result['kind'] == 'code' else ''
+        print(f"{result['score']:7.2f}  {result['title']}{heading}{label}  {location}")
+        print(f"         {search_snippet(result['text'], args.terms)}")
+
+
+def page_filter(sections, pages):
+    """Page id predicate for --section/--page subset builds.
+
+    A section matches its own page and every page id prefixed with it
+    (e.g. "language-guide", "hpm"); page patterns are shell-style globs.
+    """
+    def include(page_id):
+        if any(page_id == section or page_id.startswith(section + '-') for section in sections):
+            return True
+        return any(fnmatch.fnmatchcase(page_id, pattern) for pattern in pages)
+    return include
+
+
+def build_for_language(lang, logo_data, compress=False, assets=None, store=None,
+                       site_store=None, client_nav=False, manifest=None, include=None,
+                       version=None, versions=(), site_languages=None):
+    """Build documentation for a specific language.
+
+    With site_store, writes static site pages (see generate_site()) instead
+    of the single-file viewer, offering site_languages in their language
+    menu. Written artifacts are recorded in manifest.
+    With include (see page_filter()), builds a preview holding only the
+    matching pages to docs-preview*.html. With version (one of the names
+    in versions), builds that version's viewer into versions/<version>/,
+    with its pages in the shared store.
+    """
     global CURRENT_LANG
     CURRENT_LANG = lang
 
@@ -2735,43 +3615,169 @@ def build_for_language(lang, logo_data):
     print(f"\nBuilding {lang_name} ({lang}) documentation...")
 
     # Determine output file
+    prefix = 'docs' if include is None else 'docs-preview'
+    output_dir = Path(__file__).parent if version is None else VERSIONS_DIR / version
     if lang == 'en':
-        output_file = Path(__file__).parent / 'docs.html'
+        output_file = output_dir / f'{prefix}.html'
     else:
-        output_file = Path(__file__).parent / f'docs-{lang}.html'
+        output_file = output_dir / f'{prefix}-{lang}.html'
 
     # Collect documentation
     print("Collecting documentation files...")
-    docs = collect_docs(lang)
+    docs = collect_docs(lang, include)
     if not docs:
         print("Error: No documentation pages found")
         return False, None
     print(f"Found {len(docs)} documentation pages")
+    if include is not None:
+        selected = sum(1 for info in docs.values() if not info['stub'])
+        if not selected:
+            print("Error: No pages match the --section/--page filters")
+            return False, None
+        print(f"  Preview: {selected} pages built, {len(docs) - selected} stubbed")
+    if manifest is not None and version is None:
+        manifest['pages'][lang] = {info['id']: relative_path(info['source']) for info in docs.values()}
+    broken = check_links(docs)
+    if broken:
+        print(f"  Warning: {len(broken)} unresolved links")
+        for page_id, target in broken[:5]:
+            print(f"    {page_id}: {target}")
+
+    if site_store is not None:
+        print("Generating site pages...")
+        written = generate_site(docs, lang, site_store, client_nav, manifest, site_languages)
+        print(f"Site pages built: {SITE_DIR / lang}")
+        print(f"  - {len(docs)} pages ({written} changed)")
+        return True, docs
 
     # Generate HTML
     print("Generating HTML...")
-    html = generate_html(docs, logo_data, lang)
-
-    # Write output
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
-
-    print(f"Documentation built: {output_file}")
+    if assets is None:
+        assets = load_viewer_assets()
+    if version is None:
+        html = generate_html(docs, logo_data, lang, compress, assets, store)
+    else:
+        version_options_html = '\n'.join(
+            f'<option value="../{name}/{output_file.name}" {"selected" if name == version else ""}>{name}</option>'
+            for name in versions
+        )
+        html = generate_html(docs, logo_data, lang, compress, assets, store,
+                             f'../../{STORE_DIR.name}', version_options_html, index_in_store=True)
+
+    # Write output (skipped when the bytes are unchanged)
+    sources = [info['source'] for info in docs.values()]
+    if version is not None:
+        # Files read from other revisions are not tracked as sources
+        sources = [source for source in sources if _git_tree_for(source)[0] is None]
+    sources += [ASSETS_DIR / 'viewer.css', ASSETS_DIR / 'viewer.js']
+    # inflate.js is embedded with compressed pages or the compressed search
+    # index and highlights
+    inflate = compress or version is None
+    if inflate:
+        sources.append(ASSETS_DIR / 'inflate.js')
+    if logo_data:
+        sources.append(HEMLOCK_DIR / 'logo.png')
+    info = {'lang': lang, 'pages': len(docs)}
+    if version is not None:
+        info['version'] = version
+    if write_artifact(output_file, html, manifest, sources, **info):
+        print(f"Documentation built: {output_file}")
+    else:
+        print(f"Documentation unchanged: {output_file}")
     print(f"  - {len(docs)} pages")
+    saved = assets['css'][1] + assets['js'][1] + (assets['inflate'][1] if inflate else 0)
+    if saved:
+        print(f"  - {saved} bytes saved by minifying CSS/JS")
     return True, docs
 
 
 def main():
     """Main build function."""
+    if sys.argv[1:2] == ['query']:
+        query_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(description='Build Hemlock documentation viewer')
-    parser.add_argument('--lang', '-l', default='en',
-                        help=f'Language to build: {", ".join(SUPPORTED_LANGUAGES.keys())} or "all" (default: en)')
+    parser.add_argument('--lang', '-l', default=None,
+                        help=f'Language to build: {", ".join(SUPPORTED_LANGUAGES.keys())} or "all" (default: en, '
+                             'or all with --changed)')
+    parser.add_argument('--compress', action='store_true',
+                        help='Deflate-compress page content inside the HTML (decompressed by the browser on demand)')
+    parser.add_argument('--shared-store', action='store_true',
+                        help='Write page content once to a content-addressed store/ shared by all '
+                             'languages (pages are fetched from it, so the docs must be served over HTTP)')
+    parser.add_argument('--format', choices=['html', 'site'], default='html',
+                        help='html: one single-file viewer per language (default); '
+                             'site: one prerendered page per page and language under site/')
+    parser.add_argument('--client-nav', action='store_true',
+                        help='With --format site, load pages in place instead of following links')
+    parser.add_argument('--changed', nargs='+', metavar='PATH|RANGE',
+                        help='Only rebuild languages affected by these changed paths, or by the '
+                             'files changed in a git range such as origin/main..HEAD')
+    parser.add_argument('--section', action='append', default=[], metavar='SECTION',
+                        help='Preview build of one section (e.g. language-guide, hpm); other pages '
+                             'are stubs. Written to docs-preview*.html. Repeatable')
+    parser.add_argument('--page', action='append', default=[], metavar='PAGE_ID',
+                        help='Preview build of pages by id or glob (e.g. language-guide-strings). Repeatable')
+    parser.add_argument('--no-minify', action='store_true',
+                        help='Embed the viewer CSS/JS from assets/ as-is (readable output for debugging)')
+    parser.add_argument('--hemlock-ref', metavar='REF',
+                        help='Read the hemlock docs from this commit in the submodule repository '
+                             'instead of the checkout')
+    parser.add_argument('--hpm-ref', metavar='REF',
+                        help='Read the hpm docs from this commit in the submodule repository '
+                             'instead of the checkout')
+    parser.add_argument('--llms-budget', type=int, default=LLM_SMALL_BUDGET, metavar='TOKENS',
+                        help=f'Approximate token budget of llms-small*.txt (default: {LLM_SMALL_BUDGET})')
+    parser.add_argument('--versions', nargs='+', metavar='[NAME=]REF',
+                        help='Build the docs of several hemlock commits into versions/<name>/, '
+                             'with a version switcher; pages are shared through store/')
     args = parser.parse_args()
 
     print("Building Hemlock documentation viewer...")
 
+    # Versions are hemlock commits, each read from git objects in turn
+    versions = []
+    if args.versions:
+        if args.hemlock_ref or args.changed or args.section or args.page or args.format == 'site':
+            print("Error: --versions cannot be combined with --hemlock-ref, --changed, "
+                  "--section/--page or --format site")
+            sys.exit(1)
+        git_dir = submodule_git_dir(HEMLOCK_DIR)
+        if git_dir is None:
+            print(f"Error: no git repository found for {HEMLOCK_DIR.name}")
+            sys.exit(1)
+        for item in args.versions:
+            name, _, ref = item.rpartition('=')
+            name = name or ref
+            if not re.fullmatch(r'[\w.-]+', name) or name in (v for v, _ in versions):
+                print(f"Error: invalid or repeated version name '{name}' (use NAME=REF)")
+                sys.exit(1)
+            try:
+                versions.append((name, GitTree(git_dir, ref)))
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+        GIT_TREES[HEMLOCK_DIR] = versions[0][1]
+
+    # Read submodules straight from git objects at the requested commits
+    for directory, ref in ((HEMLOCK_DIR, args.hemlock_ref), (HPM_DIR, args.hpm_ref)):
+        if ref is None:
+            continue
+        git_dir = submodule_git_dir(directory)
+        if git_dir is None:
+            print(f"Error: no git repository found for {directory.name}")
+            print(f"  Expected {directory / '.git'} or .git/modules/{directory.name}")
+            sys.exit(1)
+        try:
+            GIT_TREES[directory] = GitTree(git_dir, ref)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"Reading {directory.name} from {ref} ({GIT_TREES[directory].commit[:12]})")
+
     # Check that hemlock submodule exists
-    if not HEMLOCK_DIR.exists():
+    if not source_exists(HEMLOCK_DIR):
         print(f"Error: hemlock submodule not found at {HEMLOCK_DIR}")
         print("Run: git submodule update --init --recursive")
         sys.exit(1)
@@ -2779,66 +3785,191 @@ def main():
     # Check for required files
     claude_md = HEMLOCK_DIR / 'CLAUDE.md'
     docs_dir = HEMLOCK_DIR / 'docs'
-    if not claude_md.exists() and not docs_dir.exists():
+    if not source_exists(claude_md) and not source_exists(docs_dir):
         print("Error: No documentation found in hemlock submodule")
         print(f"  Expected: {claude_md} or {docs_dir}")
         sys.exit(1)
 
     # Check for hpm submodule (optional but warn if missing)
-    if not HPM_DIR.exists():
+    if not source_exists(HPM_DIR):
         print(f"Warning: hpm submodule not found at {HPM_DIR}")
         print("  hpm documentation will not be included")
         print("  Run: git submodule update --init --recursive")
     else:
         hpm_docs = HPM_DIR / 'docs'
-        if hpm_docs.exists():
+        if source_exists(hpm_docs):
             print(f"Found hpm documentation at {hpm_docs}")
 
     # Encode logo (once for all languages)
     print("Encoding logo...")
     logo_path = HEMLOCK_DIR / 'logo.png'
-    logo_data = encode_image(logo_path) if logo_path.exists() else ""
+    logo_data = encode_image(logo_path) if source_exists(logo_path) else ""
     if not logo_data:
         print("Warning: logo.png not found, continuing without logo")
 
     # Determine which languages to build
-    if args.lang == 'all':
+    lang_arg = args.lang or ('all' if args.changed else 'en')
+    if lang_arg == 'all':
         languages = list(SUPPORTED_LANGUAGES.keys())
-    elif args.lang in SUPPORTED_LANGUAGES:
-        languages = [args.lang]
+    elif lang_arg in SUPPORTED_LANGUAGES:
+        languages = [lang_arg]
     else:
-        print(f"Error: Unknown language '{args.lang}'")
+        print(f"Error: Unknown language '{lang_arg}'")
         print(f"Supported languages: {', '.join(SUPPORTED_LANGUAGES.keys())}")
         sys.exit(1)
 
-    # Build for each language
+    # Content hashes of everything written, for deploys and servers
+    manifest = load_manifest(Path(__file__).parent)
+
+    # Narrow the build to languages affected by the changed paths
+    if args.changed:
+        changed_paths = []
+        for item in args.changed:
+            if '..' in item and not Path(item).exists():
+                try:
+                    changed_paths.extend(git_changed_paths(item))
+                except ValueError as e:
+                    print(f"Error: {e}")
+                    sys.exit(1)
+            else:
+                changed_paths.append(item)
+        previous = load_manifest(SITE_DIR) if args.format == 'site' else manifest
+        affected = affected_languages(changed_paths, previous)
+        languages = [lang for lang in languages if lang in affected]
+        print(f"{len(changed_paths)} changed paths")
+        for lang in languages:
+            paths = affected[lang]
+            more = f" (+{len(paths) - 3} more)" if len(paths) > 3 else ''
+            print(f"  {lang}: {', '.join(paths[:3])}{more}")
+        if not languages:
+            print("No documentation outputs are affected; nothing to rebuild")
+            return
+
+    # Load (and minify) the viewer assets once for all languages
+    assets = load_viewer_assets(minify=not args.no_minify)
+    cache_entries = {'assets': sorted(_cache_entries)}
+
+    # Shared page store (hash -> content), filled by every language (and
+    # version: versioned builds always use it)
+    store = {} if args.shared_store or versions else None
+
+    # Subset builds for authoring previews; they leave the real outputs
+    # and the manifest alone
+    include = None
+    if args.section or args.page:
+        if args.format == 'site':
+            print("Error: --section/--page previews are only available for --format html")
+            sys.exit(1)
+        include = page_filter(args.section, args.page)
+        manifest = None
+
+    # Static site: shared assets first, pages reference them. The site
+    # keeps its own manifest next to its files.
+    site_store = None
+    site_manifest = None
+    site_languages = None
+    if args.format == 'site':
+        site_store = {}
+        site_manifest = load_manifest(SITE_DIR)
+        write_site_assets(assets, logo_path, site_manifest)
+        # The languages built now or by earlier runs; pages link only to those
+        site_languages = set(languages) | set(site_manifest['pages'])
+
+    # Build for each language (of each version)
     success_count = 0
-    built_docs = {}  # Store docs for each language
-    for lang in languages:
-        success, docs = build_for_language(lang, logo_data)
-        if success:
-            success_count += 1
-            built_docs[lang] = docs
-
-    # Generate LLM-friendly documentation for all languages
-    if built_docs:
+    built_docs = {}  # Store docs for each (version, language)
+    lang_stores = {}  # And the (page, site) store entries each refers to
+    version_names = [name for name, _ in versions]
+    for version, tree in versions or [(None, None)]:
+        if tree is not None:
+            GIT_TREES[HEMLOCK_DIR] = tree
+            print(f"\n=== Version {version} ({tree.ref}, {tree.commit[:12]}) ===")
+            logo_data = encode_image(logo_path) if source_exists(logo_path) else ""
+        for lang in languages:
+            lang_store = None if store is None else {}
+            lang_site_store = None if site_store is None else {}
+            _cache_entries.clear()
+            success, docs = build_for_language(lang, logo_data, args.compress, assets, lang_store,
+                                               lang_site_store, args.client_nav, site_manifest or manifest,
+                                               include, version, version_names, site_languages)
+            if success:
+                success_count += 1
+                built_docs[(version, lang)] = docs
+                lang_stores[(version, lang)] = (lang_store, lang_site_store)
+                cache_entries[lang if version is None else f'{version}/{lang}'] = sorted(_cache_entries)
+
+    if versions:
+        # The list of versions for tools, and a landing page opening the first
+        write_artifact(VERSIONS_DIR / 'versions.json', json.dumps(
+            [{'name': name, 'ref': tree.ref, 'commit': tree.commit} for name, tree in versions],
+            indent=2) + '\n', manifest)
+        write_artifact(VERSIONS_DIR / 'index.html', redirect_html(f'{versions[0][0]}/docs.html'), manifest)
+
+    # Generate LLM-friendly documentation for all languages. Site builds
+    # only write site/; the text and search database come with --format html
+    if built_docs and include is None and args.format == 'html':
         print("\nGenerating LLM-friendly documentation...")
-        for lang, docs in built_docs.items():
-            llm_txt = generate_llm_txt(docs, lang)
-
-            # Determine output file (llms.txt for English, llms-{lang}.txt for others)
-            if lang == 'en':
-                llm_file = LLM_OUTPUT_FILE
-            else:
-                llm_file = Path(__file__).parent / f'llms-{lang}.txt'
-
-            with open(llm_file, 'w', encoding='utf-8') as f:
-                f.write(llm_txt)
-
-            lang_name = SUPPORTED_LANGUAGES.get(lang, lang)
-            print(f"  {lang_name}: {llm_file.name} ({len(llm_txt)} characters)")
-
-    print(f"\nBuild complete: {success_count}/{len(languages)} languages built successfully")
+        for (version, lang), docs in built_docs.items():
+            write_llm_docs(docs, lang, lang_stores[(version, lang)][0], manifest, version, args.llms_budget)
+
+        # Full-text search database (of the current docs, not versions)
+        if not versions:
+            search_stats = write_search_db({lang: docs for (_, lang), docs in built_docs.items()}, manifest)
+            updated = sum(pages for pages, _ in search_stats.values())
+            removed = sum(pages for _, pages in search_stats.values())
+            print(f"\nSearch database: {SEARCH_DB_FILE.name} ({len(search_stats)} languages; "
+                  f"{updated} pages reindexed, {removed} removed)")
+
+    # Merge the languages' store entries, recording which each refers to
+    # so that entries nothing refers to any more can be pruned. Languages
+    # built without the store no longer refer to any.
+    for (version, lang), (lang_store, lang_site_store) in lang_stores.items():
+        owner = lang if version is None else f'{version}/{lang}'
+        if lang_store is not None:
+            store.update(lang_store)
+            if manifest is not None:
+                manifest['store'][owner] = sorted(lang_store)
+        elif manifest is not None:
+            manifest['store'].pop(owner, None)
+        if lang_site_store is not None:
+            site_store.update(lang_site_store)
+            site_manifest['store'][owner] = sorted(lang_site_store)
+
+    if store:
+        written, total = write_store(store)
+        removed = prune_store(manifest) if manifest is not None else 0
+        print(f"\nPage store: {len(store)} entries ({total} bytes), {written} new, "
+              f"{removed} removed, in {STORE_DIR.name}/")
+    elif manifest is not None and STORE_DIR.is_dir():
+        # Entries left by an earlier --shared-store build
+        removed = prune_store(manifest)
+        if removed:
+            print(f"\nPage store: {removed} unused entries removed from {STORE_DIR.name}/")
+    if site_store:
+        written, total = write_store(site_store, SITE_DIR / 'store')
+        removed = prune_store(site_manifest, SITE_DIR / 'store')
+        print(f"\nSite page store: {len(site_store)} entries ({total} bytes), {written} new, {removed} removed")
+
+    # Drop cached documents, related pages and minified assets that no
+    # language uses any more. A version build replaces the entries of
+    # versions it no longer includes.
+    if manifest is not None:
+        if versions:
+            manifest['cache'] = {owner: names for owner, names in manifest['cache'].items()
+                                 if '/' not in owner or owner.split('/')[0] in version_names}
+        manifest['cache'].update(cache_entries)
+        removed = prune_build_cache(manifest)
+        if removed:
+            print(f"\nBuild cache: {removed} unused entries removed from {BUILD_CACHE_DIR.name}/")
+
+    # Record what was built
+    if site_manifest is not None:
+        save_manifest(site_manifest)
+    if manifest is not None and save_manifest(manifest):
+        print(f"Build manifest updated: {MANIFEST_NAME}")
+
+    print(f"\nBuild complete: {success_count}/{len(languages) * max(len(versions), 1)} "
+          f"languages built successfully")
 
 
 if __name__ == '__main__':